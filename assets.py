@@ -0,0 +1,101 @@
+import os
+import pygame
+from support import import_folder
+from atlas import Atlas, ATLAS_INDEX, load_atlas_index, atlas_is_fresh
+
+
+class AssetManager:
+    def __init__(self):
+        # Everything is keyed by path, so each file is decoded once per process
+        self.images = {}
+        self.animations = {}
+        self.sounds = {}
+        self.fonts = {}
+        self.atlas = None
+
+    def load_atlas(self, index_path=ATLAS_INDEX):
+        # Without a built, up to date atlas every image keeps being loaded from its own file
+        if not os.path.exists(index_path):
+            return False
+        index = load_atlas_index(index_path)
+        if not atlas_is_fresh(index):
+            return False
+        self.atlas = Atlas(index, os.path.dirname(index_path))
+        return True
+
+    def image(self, path, alpha=True):
+        key = (path, alpha)
+        if key not in self.images:
+            surface = self.atlas.image(path) if self.atlas and alpha else None
+            if surface is None:
+                surface = pygame.image.load(path)
+                surface = surface.convert_alpha() if alpha else surface.convert()
+            self.images[key] = surface
+        return self.images[key]
+
+    def frames(self, path):
+        if path not in self.animations:
+            frames = self.atlas.frames(path) if self.atlas else None
+            self.animations[path] = frames if frames is not None else import_folder(path)
+        return self.animations[path]
+
+    def sound(self, path, volume=None):
+        # Callers asking for another volume get their own copy instead of changing a shared one
+        key = (path, volume)
+        if key not in self.sounds:
+            sound = pygame.mixer.Sound(path)
+            if volume is not None:
+                sound.set_volume(volume)
+            self.sounds[key] = sound
+        return self.sounds[key]
+
+    def font(self, path, size):
+        key = (path, size)
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.Font(path, size)
+        return self.fonts[key]
+
+    def preload(self, images=(), folders=(), sounds=()):
+        for path in images:
+            self.image(path)
+        for path in folders:
+            self.frames(path)
+        for path in sounds:
+            self.sound(path)
+
+    def unload(self, path=None):
+        # Drops every cached asset loaded from path, or the whole cache and atlas when no path is given
+        if path is None:
+            self.atlas = None
+        for cache in (self.images, self.animations, self.sounds, self.fonts):
+            for key in list(cache):
+                cache_path = key[0] if isinstance(key, tuple) else key
+                if path is None or cache_path == path:
+                    del cache[key]
+
+    def memory_usage(self):
+        images = sum(surface_bytes(surface) for surface in self.images.values())
+        animations = sum(surface_bytes(frame) for frames in self.animations.values() for frame in frames)
+        sounds = sum(sound_bytes(sound) for sound in self.sounds.values())
+        atlas = sum(surface_bytes(sheet) for sheet in self.atlas.sheets) if self.atlas else 0
+        total = images + animations + sounds + atlas
+        return {'images': images, 'animations': animations, 'sounds': sounds, 'atlas': atlas, 'total': total}
+
+
+def surface_bytes(surface):
+    # Subsurfaces share the pixels of their parent, which is counted on its own
+    if surface.get_parent() is not None:
+        return 0
+    width, height = surface.get_size()
+    return width * height * surface.get_bytesize()
+
+
+def sound_bytes(sound):
+    mixer_settings = pygame.mixer.get_init()
+    if not mixer_settings:
+        return 0
+    frequency, sample_format, channels = mixer_settings
+    return int(sound.get_length() * frequency * channels * abs(sample_format) // 8)
+
+
+asset_manager = AssetManager()
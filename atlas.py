@@ -0,0 +1,141 @@
+import os
+import json
+import pygame
+from manifest import frame_manifest
+
+GRAPHICS_PATH = '../graphics'
+ATLAS_PATH = '../graphics/atlas'
+ATLAS_INDEX = ATLAS_PATH + '/atlas.json'
+ATLAS_SHEET_SIZE = 2048
+# Top level graphics folders that are not loaded as sprites
+ATLAS_SKIP = ('atlas', 'font', 'tilemap')
+
+
+class Atlas:
+    def __init__(self, index, atlas_folder=ATLAS_PATH):
+        # Sheets are raw RGBA pixels, loading one is a single read and copy instead of a PNG decode
+        self.sheets = []
+        for name, size in index['sheets']:
+            with open(atlas_folder + '/' + name, 'rb') as sheet_file:
+                pixels = sheet_file.read()
+            self.sheets.append(pygame.image.frombuffer(pixels, size, 'RGBA').convert_alpha())
+
+        self.images = {}
+        for name, (sheet, x, y, width, height) in index['images'].items():
+            self.images[graphics_key(name)] = self.sheets[sheet].subsurface(pygame.Rect(x, y, width, height))
+
+        self.folders = {}
+        for folder, names in index['folders'].items():
+            self.folders[graphics_key(folder)] = [self.images[graphics_key(name)] for name in names]
+
+    def image(self, path):
+        return self.images.get(os.path.normpath(path))
+
+    def frames(self, path):
+        return self.folders.get(os.path.normpath(path))
+
+
+def load_atlas_index(index_path=ATLAS_INDEX):
+    with open(index_path) as index_file:
+        return json.load(index_file)
+
+
+def atlas_is_fresh(index):
+    # Every packed folder has to still match the frame manifest, otherwise the atlas shows old frames
+    if 'sources' not in index:
+        return False
+    for folder, files in index['sources'].items():
+        try:
+            if frame_manifest.entry(GRAPHICS_PATH + '/' + folder)['files'] != files:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def graphics_key(name):
+    return os.path.normpath(GRAPHICS_PATH + '/' + name)
+
+
+def collect_graphics(root=GRAPHICS_PATH):
+    images = []
+    folders = {}
+    sources = {}
+    for folder, subfolders, _ in os.walk(root):
+        relative = os.path.relpath(folder, root).replace(os.sep, '/')
+        if relative.split('/')[0] in ATLAS_SKIP:
+            subfolders[:] = []
+            continue
+
+        entry = frame_manifest.entry(folder)
+        if not entry['files']:
+            continue
+        names = [relative + '/' + name for name, _, __ in entry['files']]
+        images.extend(names)
+        sources[relative] = entry['files']
+
+        # Only leaf folders are animations, the others just hold single images
+        if not subfolders:
+            folders[relative] = names
+    return images, folders, sources
+
+
+def pack_shelves(sizes, sheet_size):
+    # Tallest first, left to right along shelves, a new sheet once the current one is full
+    placements = [None] * len(sizes)
+    sheet = x = y = shelf_height = 0
+    for index in sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0])):
+        width, height = sizes[index]
+        if x + width > sheet_size:
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+        if y + height > sheet_size:
+            sheet += 1
+            x = y = shelf_height = 0
+        placements[index] = (sheet, x, y)
+        x += width
+        shelf_height = max(shelf_height, height)
+    return placements
+
+
+def build_atlas(root=GRAPHICS_PATH, output=ATLAS_PATH, sheet_size=ATLAS_SHEET_SIZE):
+    names, folders, sources = collect_graphics(root)
+    surfaces = [pygame.image.load(root + '/' + name).convert_alpha() for name in names]
+    sizes = [surface.get_size() for surface in surfaces]
+    placements = pack_shelves(sizes, sheet_size)
+
+    # Sheets are cropped to the area actually used
+    extents = {}
+    for (sheet, x, y), (width, height) in zip(placements, sizes):
+        used_width, used_height = extents.get(sheet, (0, 0))
+        extents[sheet] = (max(used_width, x + width), max(used_height, y + height))
+
+    sheets = []
+    for sheet in range(len(extents)):
+        sheets.append(pygame.Surface(extents[sheet], pygame.SRCALPHA))
+    for surface, (sheet, x, y) in zip(surfaces, placements):
+        # Adding onto the cleared sheet copies the pixels, alpha included, without blending
+        sheets[sheet].blit(surface, (x, y), special_flags=pygame.BLEND_RGBA_ADD)
+
+    os.makedirs(output, exist_ok=True)
+    index = {'sheets': [], 'images': {}, 'folders': folders, 'sources': sources}
+    for sheet, surface in enumerate(sheets):
+        sheet_name = f'sheet_{sheet}.rgba'
+        with open(output + '/' + sheet_name, 'wb') as sheet_file:
+            sheet_file.write(pygame.image.tostring(surface, 'RGBA'))
+        index['sheets'].append([sheet_name, list(surface.get_size())])
+    for name, (sheet, x, y), (width, height) in zip(names, placements, sizes):
+        index['images'][name] = [sheet, x, y, width, height]
+
+    with open(output + '/atlas.json', 'w') as index_file:
+        json.dump(index, index_file, separators=(',', ':'))
+    return index
+
+
+if __name__ == '__main__':
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    index = build_atlas()
+    frame_manifest.save()
+    print(f"Packed {len(index['images'])} images into {len(index['sheets'])} sheets at {ATLAS_PATH}")
@@ -0,0 +1,51 @@
+import numpy as np
+from settings import *
+
+STATUSES = ('idle', 'move', 'attack')
+IDLE, MOVE, ATTACK = range(3)
+TIERS = ('awake', 'drowsy', 'asleep')
+AWAKE, DROWSY, ASLEEP = range(3)
+
+
+class EnemyBatch:
+    def __init__(self, thresholds):
+        # thresholds maps a monster name to its squared awake and drowsy distances
+        self.thresholds = thresholds
+        self.enemies = []
+        self.attack_radius = np.empty(0)
+        self.notice_radius = np.empty(0)
+        self.awake_sq = np.empty(0)
+        self.drowsy_sq = np.empty(0)
+
+    def sync(self, enemies):
+        # The per enemy constants are only gathered again when enemies spawn or die
+        if enemies == self.enemies:
+            return
+        self.enemies = list(enemies)
+        self.attack_radius = np.array([enemy.attack_radius for enemy in enemies], dtype=float)
+        self.notice_radius = np.array([enemy.notice_radius for enemy in enemies], dtype=float)
+        self.awake_sq = np.array([self.thresholds[enemy.monster_name][0] for enemy in enemies], dtype=float)
+        self.drowsy_sq = np.array([self.thresholds[enemy.monster_name][1] for enemy in enemies], dtype=float)
+
+    def offsets(self, enemies, player_pos):
+        positions = np.array([enemy.rect.center for enemy in enemies], dtype=float).reshape(len(enemies), 2)
+        return np.asarray(player_pos, dtype=float) - positions
+
+    def tiers(self, enemies, player_pos):
+        self.sync(enemies)
+        offset = self.offsets(enemies, player_pos)
+        distance_sq = np.einsum('ij,ij->i', offset, offset)
+        return np.where(distance_sq <= self.awake_sq, AWAKE, np.where(distance_sq <= self.drowsy_sq, DROWSY, ASLEEP))
+
+    def decide(self, indices, player_pos):
+        # Status and unit direction to the player for the enemies that moved this frame, same rules as Enemy.get_status
+        enemies = [self.enemies[index] for index in indices]
+        offset = self.offsets(enemies, player_pos)
+        distance = np.sqrt(np.einsum('ij,ij->i', offset, offset))
+        direction = offset / np.where(distance > 0, distance, 1)[:, None]
+        attacking = np.fromiter((enemy.isAttacking for enemy in enemies), dtype=bool, count=len(enemies))
+
+        status = np.where(
+            (distance <= self.attack_radius[indices]) & ~attacking, ATTACK,
+            np.where(distance <= self.notice_radius[indices], MOVE, IDLE))
+        return enemies, status, direction
@@ -0,0 +1,521 @@
+import os
+import sys
+import json
+import argparse
+import tracemalloc
+from statistics import median
+from time import perf_counter
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+from settings import *
+
+
+def setup_display():
+    pygame.init()
+    return pygame.display.set_mode((WIDTH, HEIGHT))
+
+
+def spawn_enemies(level, count, seed=0):
+    # Same spots for every run, spread over about a screen around the player
+    from random import Random
+
+    rng = Random(seed)
+    row, col = level.player.rect.centery // TILESIZE, level.player.rect.centerx // TILESIZE
+    return [
+        level.create_tile('entities', row + rng.randint(-8, 8), col + rng.randint(-10, 10), rng.randint(390, 393))
+        for _ in range(count)]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def time_runs(function, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter()
+        function()
+        timings.append((perf_counter() - start) * 1000)
+    return timings
+
+
+def benchmark_assets(args):
+    from assets import asset_manager
+    from atlas import ATLAS_INDEX, GRAPHICS_PATH, build_atlas, collect_graphics
+    from manifest import FrameManifest
+
+    setup_display()
+    if args.rebuild or not os.path.exists(ATLAS_INDEX):
+        build_atlas()
+
+    images, folders, _ = collect_graphics()
+    packed = {name for frames in folders.values() for name in frames}
+    loose_images = [name for name in images if name not in packed]
+
+    def load_everything():
+        for folder in folders:
+            asset_manager.frames(GRAPHICS_PATH + '/' + folder)
+        for name in loose_images:
+            asset_manager.image(GRAPHICS_PATH + '/' + name)
+
+    def per_file():
+        asset_manager.unload()
+        load_everything()
+
+    def from_atlas():
+        asset_manager.unload()
+        asset_manager.load_atlas()
+        load_everything()
+
+    def scanned_frame_lists():
+        manifest = FrameManifest()
+        manifest.folders = {}
+        for folder in folders:
+            manifest.files(GRAPHICS_PATH + '/' + folder)
+        return manifest
+
+    def manifest_frame_lists():
+        manifest = FrameManifest()
+        manifest.folders = fresh_manifest.folders
+        for folder in folders:
+            manifest.files(GRAPHICS_PATH + '/' + folder)
+
+    fresh_manifest = scanned_frame_lists()
+
+    print(f'{len(images)} images in {len(folders)} animation folders, {args.repeats} runs each')
+    for name, function in (('scanned', scanned_frame_lists), ('manifest', manifest_frame_lists)):
+        timings = time_runs(function, args.repeats)
+        print(f'{name:>10}: median {median(timings):8.2f} ms  min {min(timings):8.2f} ms  (frame lists)')
+    for name, function in (('per file', per_file), ('atlas', from_atlas)):
+        timings = time_runs(function, args.repeats)
+        print(f'{name:>10}: median {median(timings):8.2f} ms  min {min(timings):8.2f} ms')
+    asset_manager.unload()
+
+
+def benchmark_map(args):
+    from support import import_csv_layout
+    from mapfile import MAP_LAYERS, MAP_PATH, compile_map, read_compiled_map
+
+    if args.rebuild or not os.path.exists(MAP_PATH):
+        compile_map()
+
+    def csv_strings():
+        return {name: import_csv_layout(path) for name, path in MAP_LAYERS.items()}
+
+    def count_tiles(layers):
+        return sum(1 for layer in layers.values() for row in layer for col in row if int(col) != -1)
+
+    print(f'{len(MAP_LAYERS)} layers, {args.repeats} runs each')
+    loaders = (
+        ('csv', csv_strings),
+        ('compiled', lambda: read_compiled_map(MAP_PATH)),
+        ('mapped', lambda: read_compiled_map(MAP_PATH, mapped=True))
+    )
+    for name, function in loaders:
+        timings = time_runs(function, args.repeats)
+        tracemalloc.start()
+        layers = function()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f'{name:>10}: median {median(timings):8.2f} ms  {memory / 1024:8.1f} KiB  {count_tiles(layers)} tiles')
+
+
+def tiled_layer(layer, scale):
+    # The layer repeated scale times each way, a stand-in for a bigger world
+    from array import array
+    from mapfile import MapLayer
+
+    data = array('h')
+    for _ in range(scale):
+        for row in layer:
+            data.extend(array('h', row) * scale)
+    return MapLayer(data, layer.rows * scale, layer.cols * scale)
+
+
+def benchmark_tilemap(args):
+    from level import ObstacleGroup
+    from mapfile import load_map
+    from tile import Tile
+    from tilemap import TileMap
+    from random import Random
+
+    setup_display()
+    layouts = load_map()
+    layer = tiled_layer(layouts['boundary'], args.scale)
+    sprite_layers = [(style, tiled_layer(layouts[style], args.scale)) for style in ('grass', 'object')]
+
+    def obstacle_group():
+        # Grass and objects stay sprites either way
+        obstacles = ObstacleGroup()
+        for style, sprite_layer in sprite_layers:
+            for row_index, col_index, tile_id in sprite_layer.tiles():
+                Tile((col_index * TILESIZE, row_index * TILESIZE), [obstacles], style)
+        return obstacles
+
+    def sprites():
+        # What Level.create_map used to do, an invisible Tile per boundary cell
+        obstacles = obstacle_group()
+        for row_index, col_index, tile_id in layer.tiles():
+            Tile((col_index * TILESIZE, row_index * TILESIZE), [obstacles], 'invisible')
+        return obstacles
+
+    def tilemap():
+        obstacles = obstacle_group()
+        obstacles.tilemap = TileMap.from_layer(layer)
+        return obstacles
+
+    # Hitbox sized rects all over the map, like the ones entities sweep through
+    rng = Random(0)
+    rects = [
+        pygame.Rect(rng.randrange(layer.cols * TILESIZE), rng.randrange(layer.rows * TILESIZE), 64, 54)
+        for _ in range(args.queries)]
+
+    print(f'{layer.rows}x{layer.cols} boundary cells, {args.repeats} builds and {args.queries} queries each')
+    for name, build in (('sprites', sprites), ('tilemap', tilemap)):
+        build_timings = time_runs(build, args.repeats)
+        tracemalloc.start()
+        obstacles = build()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        query_timings = time_runs(lambda: [obstacles.query(rect) for rect in rects], args.repeats)
+        blocks = sum(len(obstacles.query(rect)) for rect in rects)
+        print(
+            f'{name:>10}: build {median(build_timings):8.2f} ms  {memory / 1024:9.1f} KiB  '
+            f'queries {median(query_timings):7.2f} ms  {blocks} hits')
+
+
+def benchmark_enemies(args):
+    from level import Level
+    import scheduler as scheduler_module
+
+    setup_display()
+    level = Level(streaming=True)
+    player = level.player
+    scheduler = level.visible_sprites.enemy_scheduler
+    batch = scheduler.batch
+    if batch is None:
+        print('NumPy is not installed, only the per enemy path can be measured')
+
+    def decide_each(enemies):
+        for enemy in enemies:
+            distance, direction = enemy.get_player_dist_direct(player)
+            enemy.get_status(distance)
+
+    def decide_batch(enemies):
+        batch.tiers(enemies, player.rect.center)
+        batch.decide(range(len(enemies)), player.rect.center)
+
+    # Measure the batch at every size, not only past the point where the game switches to it
+    scheduler_module.AI_BATCH_MIN = 0
+
+    print(f'{args.frames} frames each, milliseconds per frame')
+    failed = False
+    for count in args.counts:
+        results = []
+        for name, decide, frame_batch in (('per enemy', decide_each, None), ('numpy', decide_batch, batch)):
+            if name == 'numpy' and batch is None:
+                continue
+            enemies = spawn_enemies(level, count, count)
+            decide_timings = time_runs(lambda: decide(enemies), args.frames)
+            scheduler.batch = frame_batch
+            frame_timings = time_runs(lambda: scheduler.update(enemies, player), args.frames)
+            results.append(f'{name} {median(decide_timings):7.3f} decide {median(frame_timings):7.3f} frame')
+            spread = drowsy_spread(scheduler, enemies)
+            for enemy in enemies:
+                enemy.kill()
+        print(f'{count:>5} enemies: ' + '  |  '.join(results) + f'  |  turns per frame of the drowsy interval {spread}')
+        if max(spread) - min(spread) > 1:
+            print(f'REGRESSION drowsy enemies bunch up on the same frames: {spread}')
+            failed = True
+    scheduler.batch = batch
+    return 1 if failed else 0
+
+
+def drowsy_spread(scheduler, enemies):
+    # How many of the enemies would take their drowsy tick on each frame of the interval
+    return [sum(1 for enemy in enemies if scheduler.drowsy_turn(enemy, frame)) for frame in range(AI_DROWSY_INTERVAL)]
+
+
+def benchmark_sfx(args):
+    from random import Random
+    from time import sleep
+    from assets import asset_manager
+    from sfx import SoundEffects
+
+    setup_display()
+    if not pygame.mixer.get_init():
+        print('No mixer, even the dummy audio driver failed to start')
+        return 1
+
+    # The same storm for both: every frame a burst of enemies somewhere around the player attack, get hit or die
+    rng = Random(0)
+    sounds = [(info['attack_sound'], 0.3, 1) for info in monster_data.values()]
+    sounds += [('../audio/hit.wav', 0.6, 2), ('../audio/death.wav', 0.6, 2)]
+    frames = [
+        [(rng.choice(sounds), (rng.uniform(-1200, 1200), rng.uniform(-1200, 1200))) for _ in range(rng.randint(0, args.burst))]
+        for _ in range(args.frames)]
+    requests = sum(len(frame) for frame in frames)
+
+    def storm(play):
+        # Played in real time, the dummy driver mixes like a sound card would
+        seconds = 0.0
+        for frame in frames:
+            start = perf_counter()
+            for sound, pos in frame:
+                play(sound, pos)
+            seconds += perf_counter() - start
+            sleep(1 / FPS)
+        pygame.mixer.stop()
+        return seconds * 1e6 / max(requests, 1)
+
+    channel_count = sum(SFX_CHANNELS.values())
+    print(f'{requests} requests over {args.frames} frames, {channel_count} channels, microseconds per request')
+
+    pygame.mixer.set_num_channels(channel_count)
+    pygame.mixer.set_reserved(0)
+    raw = {'played': 0, 'refused': 0}
+
+    def play_raw(sound, pos):
+        path, volume, priority = sound
+        raw['played' if asset_manager.sound(path, volume).play() else 'refused'] += 1
+
+    cost = storm(play_raw)
+    print(f'{"play()":>8}: {cost:6.1f} us  ' + '  '.join(f'{name} {count}' for name, count in raw.items()))
+
+    manager = SoundEffects()
+    manager.listen((0, 0))
+    cost = storm(lambda sound, pos: manager.effect(sound[0], sound[1], 'enemy', sound[2]).play(pos))
+    print(f'{"sfx":>8}: {cost:6.1f} us  ' + '  '.join(f'{name} {count}' for name, count in manager.counts.items()))
+
+
+def stacked_pairs(enemies, distance=16):
+    # Pairs of enemies standing within a few pixels of each other, pairwise is fine for a one off count
+    centers = [enemy.hitbox.center for enemy in enemies if enemy.alive()]
+    return sum(
+        1 for index, (x, y) in enumerate(centers) for other_x, other_y in centers[index + 1:]
+        if abs(x - other_x) < distance and abs(y - other_y) < distance)
+
+
+def benchmark_crowd(args):
+    from level import Level
+    from crowd import Crowd
+
+    setup_display()
+    level = Level(streaming=True)
+    player = level.player
+    scheduler = level.visible_sprites.enemy_scheduler
+    crowd = scheduler.crowd
+
+    print(f'{args.frames} frames each, milliseconds per frame and pairs of enemies stacked within 16 px at the end')
+    for count in args.counts:
+        results = []
+        for name, frame_crowd in (('straight', None), ('crowd', Crowd())):
+            enemies = spawn_enemies(level, count, count)
+            scheduler.crowd = frame_crowd
+            frame_timings = time_runs(lambda: scheduler.update(enemies, player), args.frames)
+            results.append(f'{name} {median(frame_timings):7.3f} frame {stacked_pairs(enemies):5} stacked')
+            for enemy in enemies:
+                enemy.kill()
+        print(f'{count:>5} enemies: ' + '  |  '.join(results))
+    scheduler.crowd = crowd
+
+
+FRAME_SUBSYSTEMS = ('custom_draw', 'enemy_update', 'collision', 'player_attack_logic', 'ui_display', 'upgrade_display')
+
+
+def grass_field(level):
+    # A field of grass around the player to cut through
+    row, col = level.player.rect.centery // TILESIZE, level.player.rect.centerx // TILESIZE
+    for row_index in range(row - 6, row + 7):
+        for col_index in range(col - 8, col + 9):
+            if (row_index, col_index) != (row, col):
+                level.create_tile('grass', row_index, col_index, 0)
+
+
+def refill_energy(level):
+    level.player.energy = level.player.stats['energy']
+
+
+def walk_script(keys, length=40, press=None):
+    # Walks a square with the given keys held on top of the arrows, only for the first press frames if given
+    script = []
+    for index, arrow in enumerate(('left', 'up', 'right', 'down') * 20):
+        script.append([index * length, [arrow] + keys])
+        if press:
+            script.append([index * length + press, [arrow]])
+    return script
+
+
+# name: (input script, setup once the level exists, called before every frame)
+FRAME_SCENARIOS = {
+    'idle': ([], None, None),
+    'swarm': ([], lambda level: spawn_enemies(level, 150), None),
+    'grass': (walk_script(['space', 'left ctrl'], 34, 4), grass_field, refill_energy),
+    'flame': (walk_script(['left ctrl'], 30), None, refill_energy),
+    'menu': ([[0, ['m']], [2, []]] + [[frame, [('right', 'left')[frame // 20 % 2]]] for frame in range(10, 3000, 20)], None, None)
+}
+
+
+class FrameTimer:
+    def __init__(self):
+        self.current = dict.fromkeys(FRAME_SUBSYSTEMS, 0.0)
+        self.samples = {name: [] for name in FRAME_SUBSYSTEMS + ('frame',)}
+
+    def wrap(self, name, function):
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.current[name] += perf_counter() - start
+        return timed
+
+    def record(self, frame_time):
+        self.samples['frame'].append(frame_time * 1000)
+        for name, total in self.current.items():
+            self.samples[name].append(total * 1000)
+            self.current[name] = 0.0
+
+    def summary(self):
+        return {
+            name: {'p50': percentile(values, 0.5), 'p95': percentile(values, 0.95), 'p99': percentile(values, 0.99)}
+            for name, values in self.samples.items()}
+
+
+def run_frame_scenario(name, frames, warmup):
+    from entity import Entity
+    from headless import HeadlessGame, ScriptedInput
+
+    script, setup, before_frame = FRAME_SCENARIOS[name]
+    game = HeadlessGame(ScriptedInput(script))
+    level = game.level
+    if setup:
+        setup(level)
+
+    # Timing wrappers on the instances, and on the class for the collision every entity shares
+    timer = FrameTimer()
+    level.visible_sprites.custom_draw = timer.wrap('custom_draw', level.visible_sprites.custom_draw)
+    level.visible_sprites.enemy_update = timer.wrap('enemy_update', level.visible_sprites.enemy_update)
+    level.player_attack_logic = timer.wrap('player_attack_logic', level.player_attack_logic)
+    level.ui.display = timer.wrap('ui_display', level.ui.display)
+    level.upgrade.display = timer.wrap('upgrade_display', level.upgrade.display)
+    collision = Entity.collision
+    Entity.collision = timer.wrap('collision', collision)
+
+    try:
+        for frame in range(warmup + frames):
+            if before_frame:
+                before_frame(level)
+            start = perf_counter()
+            game.step()
+            frame_time = perf_counter() - start
+            if frame >= warmup:
+                timer.record(frame_time)
+            else:
+                timer.current = dict.fromkeys(FRAME_SUBSYSTEMS, 0.0)
+    finally:
+        Entity.collision = collision
+    return timer.summary()
+
+
+def find_regressions(results, baseline, tolerance, noise):
+    regressions = []
+    for scenario, subsystems in results.items():
+        for subsystem, stats in subsystems.items():
+            for stat in ('p50', 'p95'):
+                try:
+                    before = baseline[scenario][subsystem][stat]
+                except KeyError:
+                    continue
+                if stats[stat] > before * (1 + tolerance) and stats[stat] - before > noise:
+                    regressions.append(f'{scenario} {subsystem} {stat} {before:.3f} -> {stats[stat]:.3f} ms')
+    return regressions
+
+
+def benchmark_frames(args):
+    from runtime import runtime
+
+    results = {}
+    print(f'{args.frames} frames per scenario after {args.warmup} warmup frames, milliseconds')
+    for name in args.scenarios:
+        results[name] = run_frame_scenario(name, args.frames, args.warmup)
+        print(f'{name}')
+        for subsystem, stats in results[name].items():
+            print(f'  {subsystem:>20}: p50 {stats["p50"]:7.3f}  p95 {stats["p95"]:7.3f}  p99 {stats["p99"]:7.3f}')
+    runtime.reset()
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=1)
+        print(f'baseline saved to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'no baseline at {args.baseline}, run with --save-baseline first')
+        return 0
+
+    with open(args.baseline) as baseline_file:
+        regressions = find_regressions(results, json.load(baseline_file), args.tolerance, args.noise)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    if not regressions:
+        print(f'no regressions against {args.baseline}')
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ZelSoul benchmarks, run from the game folder like main.py')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    assets_parser = commands.add_parser('assets', help='startup asset loading, per file PNGs against the packed atlas')
+    assets_parser.add_argument('--repeats', type=int, default=10)
+    assets_parser.add_argument('--rebuild', action='store_true', help='rebuild the atlas before measuring')
+    assets_parser.set_defaults(function=benchmark_assets)
+
+    map_parser = commands.add_parser('map', help='map loading, CSV string grids against the compiled int16 map')
+    map_parser.add_argument('--repeats', type=int, default=10)
+    map_parser.add_argument('--rebuild', action='store_true', help='recompile the map before measuring')
+    map_parser.set_defaults(function=benchmark_map)
+
+    tilemap_parser = commands.add_parser('tilemap', help='boundary collision, invisible Tile sprites against the array backed tile map')
+    tilemap_parser.add_argument('--repeats', type=int, default=5)
+    tilemap_parser.add_argument('--scale', type=int, default=4, help='repeat the map this many times each way')
+    tilemap_parser.add_argument('--queries', type=int, default=10000)
+    tilemap_parser.set_defaults(function=benchmark_tilemap)
+
+    enemies_parser = commands.add_parser('enemies', help='enemy AI, per enemy vector math against the NumPy batch')
+    enemies_parser.add_argument('--frames', type=int, default=100)
+    enemies_parser.add_argument('--counts', type=int, nargs='+', default=[10, 100, 1000])
+    enemies_parser.set_defaults(function=benchmark_enemies)
+
+    sfx_parser = commands.add_parser('sfx', help='a fight worth of sound requests, straight to the mixer against the voice manager')
+    sfx_parser.add_argument('--frames', type=int, default=180)
+    sfx_parser.add_argument('--burst', type=int, default=6, help='most sound requests in one frame')
+    sfx_parser.set_defaults(function=benchmark_sfx)
+
+    crowd_parser = commands.add_parser('crowd', help='enemies chasing the player with and without crowd separation')
+    crowd_parser.add_argument('--frames', type=int, default=300)
+    crowd_parser.add_argument('--counts', type=int, nargs='+', default=[100, 300, 600])
+    crowd_parser.set_defaults(function=benchmark_crowd)
+
+    frames_parser = commands.add_parser('frames', help='headless frame times per subsystem for canned scenarios, against a stored baseline')
+    frames_parser.add_argument('--frames', type=int, default=600)
+    frames_parser.add_argument('--warmup', type=int, default=30)
+    frames_parser.add_argument('--scenarios', nargs='+', choices=list(FRAME_SCENARIOS), default=list(FRAME_SCENARIOS))
+    frames_parser.add_argument('--baseline', default='benchmark_baseline.json')
+    frames_parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    frames_parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown as a fraction of the baseline')
+    frames_parser.add_argument('--noise', type=float, default=0.05, help='slowdowns under this many milliseconds are ignored')
+    frames_parser.set_defaults(function=benchmark_frames)
+
+    args = parser.parse_args()
+    sys.exit(args.function(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import pygame
+from settings import *
+from assets import asset_manager
+
+
+class StaticLayer:
+    def __init__(self, layers, chunk_size=CHUNK_SIZE, bake_all=True):
+        # layers is a list of (layout, tileset path) pairs, drawn bottom to top
+        self.layers = []
+        for layout, tileset_path in layers:
+            tileset = asset_manager.image(tileset_path)
+            self.layers.append((layout, self.slice_tileset(tileset)))
+
+        self.chunk_size = chunk_size
+        self.chunk_pixels = chunk_size * TILESIZE
+        self.rows = max(len(layout) for layout, _ in self.layers)
+        self.cols = max(len(layout[0]) for layout, _ in self.layers)
+
+        # Bake every chunk up front, drawing a frame is then one blit per chunk on screen.
+        # A streamed world bakes and drops chunks itself as they are loaded and unloaded.
+        self.chunks = {}
+        if bake_all:
+            for chunk_row in range(0, self.rows, chunk_size):
+                for chunk_col in range(0, self.cols, chunk_size):
+                    self.bake_chunk(chunk_col // chunk_size, chunk_row // chunk_size)
+
+    def slice_tileset(self, tileset):
+        tiles = []
+        for top in range(0, tileset.get_height(), TILESIZE):
+            for left in range(0, tileset.get_width(), TILESIZE):
+                tiles.append(tileset.subsurface(pygame.Rect(left, top, TILESIZE, TILESIZE)))
+        return tiles
+
+    def bake_chunk(self, chunk_x, chunk_y):
+        first_col = chunk_x * self.chunk_size
+        first_row = chunk_y * self.chunk_size
+        last_col = min(first_col + self.chunk_size, self.cols)
+        last_row = min(first_row + self.chunk_size, self.rows)
+
+        surface = pygame.Surface(((last_col - first_col) * TILESIZE, (last_row - first_row) * TILESIZE)).convert()
+        surface.fill(WATER_COLOR)
+        for layout, tiles in self.layers:
+            for row_index in range(first_row, min(last_row, len(layout))):
+                row = layout[row_index]
+                for col_index in range(first_col, min(last_col, len(row))):
+                    tile_id = row[col_index]
+                    if tile_id != -1:
+                        pos = ((col_index - first_col) * TILESIZE, (row_index - first_row) * TILESIZE)
+                        surface.blit(tiles[tile_id], pos)
+
+        self.chunks[(chunk_x, chunk_y)] = surface
+
+    def drop_chunk(self, chunk_x, chunk_y):
+        self.chunks.pop((chunk_x, chunk_y), None)
+
+    def draw(self, surface, camera_rect):
+        left = max(camera_rect.left // self.chunk_pixels, 0)
+        top = max(camera_rect.top // self.chunk_pixels, 0)
+        right = camera_rect.right // self.chunk_pixels
+        bottom = camera_rect.bottom // self.chunk_pixels
+
+        blits = []
+        for chunk_y in range(top, bottom + 1):
+            for chunk_x in range(left, right + 1):
+                chunk = self.chunks.get((chunk_x, chunk_y))
+                if chunk:
+                    pos = (chunk_x * self.chunk_pixels - camera_rect.left, chunk_y * self.chunk_pixels - camera_rect.top)
+                    blits.append((chunk, pos))
+        surface.blits(blits, False)
+        return len(blits)
@@ -0,0 +1,72 @@
+from math import ceil
+from settings import *
+from profiler import profiler
+
+
+def pixels(distance):
+    # Rounded half away from zero, like pygame does when a float is added to a Rect
+    return int(distance + 0.5) if distance >= 0 else -int(0.5 - distance)
+
+
+def sweep_x(hitbox, dx, obstacles):
+    if dx == 0:
+        return False
+    moved = hitbox.move(dx, 0)
+    swept = moved.union(hitbox)
+    candidates = obstacles.query(swept)
+    profiler.count('collision_checks', len(candidates))
+
+    # Obstacles ahead that the sweep crosses stop the move, ones it ends up inside push it back like before
+    hit = False
+    for sprite in candidates:
+        other = sprite.hitbox
+        if dx > 0:
+            if other.colliderect(moved) or (other.left >= hitbox.right and other.colliderect(swept)):
+                moved.right = min(moved.right, other.left)
+                hit = True
+        else:
+            if other.colliderect(moved) or (other.right <= hitbox.left and other.colliderect(swept)):
+                moved.left = max(moved.left, other.right)
+                hit = True
+    hitbox.x = moved.x
+    return hit
+
+
+def sweep_y(hitbox, dy, obstacles):
+    if dy == 0:
+        return False
+    moved = hitbox.move(0, dy)
+    swept = moved.union(hitbox)
+    candidates = obstacles.query(swept)
+    profiler.count('collision_checks', len(candidates))
+
+    hit = False
+    for sprite in candidates:
+        other = sprite.hitbox
+        if dy > 0:
+            if other.colliderect(moved) or (other.top >= hitbox.bottom and other.colliderect(swept)):
+                moved.bottom = min(moved.bottom, other.top)
+                hit = True
+        else:
+            if other.colliderect(moved) or (other.bottom <= hitbox.top and other.colliderect(swept)):
+                moved.top = max(moved.top, other.bottom)
+                hit = True
+    hitbox.y = moved.y
+    return hit
+
+
+def move_hitbox(hitbox, dx, dy, obstacles, max_step=COLLISION_STEP):
+    # Moves the hitbox in place, horizontally then vertically, and tells on which axes something was hit.
+    # obstacles is a broadphase with query(rect) returning sprites with a hitbox, like ObstacleGroup.
+    # Long moves are split so the path stays close to the straight line instead of one big L.
+    steps = max(1, ceil(max(abs(dx), abs(dy)) / max_step))
+    hit_x = hit_y = False
+    done_x = done_y = 0
+    for step in range(1, steps + 1):
+        step_x = pixels(dx * step / steps) - done_x
+        step_y = pixels(dy * step / steps) - done_y
+        done_x += step_x
+        done_y += step_y
+        hit_x = sweep_x(hitbox, step_x, obstacles) or hit_x
+        hit_y = sweep_y(hitbox, step_y, obstacles) or hit_y
+    return hit_x, hit_y
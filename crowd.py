@@ -0,0 +1,68 @@
+from math import hypot
+from settings import *
+from profiler import profiler
+
+
+class Crowd:
+    def __init__(self, radius=CROWD_RADIUS, max_neighbours=CROWD_MAX_NEIGHBOURS, weight=CROWD_SEPARATION):
+        # Rebuilt every step from the enemies that thought, so only enemies in neighbouring cells are compared
+        self.radius = radius
+        self.max_neighbours = max_neighbours
+        self.weight = weight
+        self.cells = {}
+
+    def build(self, enemies):
+        self.cells = cells = {}
+        radius = self.radius
+        for order, enemy in enumerate(enemies):
+            x, y = enemy.hitbox.center
+            cells.setdefault((x // radius, y // radius), []).append((enemy, x, y, order))
+
+    def separation(self, enemy, x, y, order):
+        # Push away from the closest few neighbours, harder the closer they are
+        radius = self.radius
+        col, row = x // radius, y // radius
+        push_x = push_y = 0.0
+        found = checked = 0
+        for cell_row in (row - 1, row, row + 1):
+            for cell_col in (col - 1, col, col + 1):
+                for other, other_x, other_y, other_order in self.cells.get((cell_col, cell_row), ()):
+                    if other is enemy:
+                        continue
+                    checked += 1
+                    dx, dy = x - other_x, y - other_y
+                    distance = hypot(dx, dy)
+                    if distance >= radius:
+                        continue
+                    if distance == 0:
+                        # Stacked on the same pixel, the order they thought in decides who steps aside
+                        dx, distance = (1 if order > other_order else -1), 1
+                    strength = 1 - distance / radius
+                    push_x += dx / distance * strength
+                    push_y += dy / distance * strength
+                    found += 1
+                    if found == self.max_neighbours:
+                        profiler.count('crowd_checks', checked)
+                        return push_x, push_y
+        profiler.count('crowd_checks', checked)
+        return push_x, push_y
+
+    def steer(self, enemies, player):
+        self.build(enemies)
+        player_x, player_y = player.rect.center
+        for cell in self.cells.values():
+            for enemy, x, y, order in cell:
+                # Idle enemies stand still and knocked back ones keep flying
+                if enemy.status == 'idle' or enemy.isInvincible:
+                    continue
+                push_x, push_y = self.separation(enemy, x, y, order)
+
+                # Arrival, slowing down inside the attack radius to stop at half of it instead of on the player
+                stop = enemy.attack_radius / 2
+                distance = hypot(player_x - enemy.rect.centerx, player_y - enemy.rect.centery)
+                arrival = min(1.0, max(0.0, (distance - stop) / stop))
+
+                direction = enemy.direction * arrival
+                direction.x += push_x * self.weight
+                direction.y += push_y * self.weight
+                enemy.direction = direction
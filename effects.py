@@ -0,0 +1,36 @@
+import pygame
+from settings import *
+
+
+class Effects:
+    def __init__(self):
+        # Faded copies of shared animation frames, keyed by (frame, alpha) and made once
+        self.variants = {}
+        self.hidden = pygame.Surface((0, 0))
+
+    def faded(self, frame, alpha):
+        if alpha >= 255:
+            return frame
+        if alpha <= 0:
+            # Nothing to draw, an empty surface blits for free
+            return self.hidden
+
+        key = (frame, alpha)
+        variant = self.variants.get(key)
+        if variant is None:
+            # The alpha is baked into the pixels, blitting it needs no extra surface alpha pass
+            variant = frame.copy()
+            variant.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+            self.variants[key] = variant
+        return variant
+
+    def clear(self):
+        self.variants = {}
+
+
+def flicker_alpha(ticks):
+    # Visible and hidden in turns of FLICKER_INTERVAL milliseconds
+    return 255 if (ticks // FLICKER_INTERVAL) % 2 == 0 else 0
+
+
+effects = Effects()
@@ -1,11 +1,15 @@
 import pygame
 from settings import *
+from runtime import runtime
 from entity import Entity
 from support import *
+from assets import asset_manager
+from effects import effects
+from sfx import sfx
 
 
 class Enemy(Entity):
-    def __init__(self, monster_name, pos, groups, obstacle_sprites, damage_player, trigger_death_particles, add_exp):
+    def __init__(self, monster_name, pos, groups, obstacle_sprites, damage_player, trigger_death_particles, add_exp, flow_field=None):
         # General setup
         super().__init__(groups)
         self.sprite_type = 'enemy'
@@ -17,6 +21,7 @@ class Enemy(Entity):
         self.rect = self.image.get_rect(topleft=pos)
         self.hitbox = self.rect.inflate(0, -10)
         self.obstacle_sprites = obstacle_sprites
+        self.flow_field = flow_field
 
         # Stats
         self.monster_name = monster_name
@@ -44,18 +49,15 @@ class Enemy(Entity):
         self.invincibility_Duration = 300
 
         # Sounds
-        self.death_sound = pygame.mixer.Sound('../audio/death.wav')
-        self.hit_sound = pygame.mixer.Sound('../audio/hit.wav')
-        self.attack_sound = pygame.mixer.Sound(monster_info['attack_sound'])
-        self.death_sound.set_volume(0.6)
-        self.hit_sound.set_volume(0.6)
-        self.attack_sound.set_volume(0.3)
+        self.death_sound = sfx.effect('../audio/death.wav', 0.6, 'enemy', priority=2)
+        self.hit_sound = sfx.effect('../audio/hit.wav', 0.6, 'enemy', priority=2)
+        self.attack_sound = sfx.effect(monster_info['attack_sound'], 0.3, 'enemy')
 
     def import_graphics(self, name):
         self.animations = {'idle': [], 'move': [], 'attack': []}
         main_path = f'../graphics/monsters/{name}/'
         for animation in self.animations.keys():
-            self.animations[animation] = import_folder(main_path + animation)
+            self.animations[animation] = asset_manager.frames(main_path + animation)
 
     def get_player_dist_direct(self, player):
         enemy_vec = pygame.math.Vector2(self.rect.center)
@@ -69,33 +71,39 @@ class Enemy(Entity):
 
         return distance, direction
 
-    def get_status(self, player):
-        distance = self.get_player_dist_direct(player)[0]
-
+    def get_status(self, distance):
         if distance <= self.attack_radius and not self.isAttacking:
-            if self.status != 'attack':
-                self.frame_index = 0
-            self.status = 'attack'
+            return 'attack'
         elif distance <= self.notice_radius:
-            self.status = 'move'
+            return 'move'
         else:
-            self.status = 'idle'
+            return 'idle'
+
+    def set_status(self, status):
+        if status == 'attack' and self.status != 'attack':
+            self.frame_index = 0
+        self.status = status
 
-    def actions(self, player):
+    def actions(self, direction):
         if self.status == 'attack':
-            self.attack_time = pygame.time.get_ticks()
+            self.attack_time = runtime.get_ticks()
             self.damage_player(self.attack_damage, self.attack_type)
-            self.attack_sound.play()
+            # The status stays on attack for the whole animation, the sound goes with its first frame
+            if self.frame_index == 0:
+                self.attack_sound.play(self.rect.center)
         elif self.status == 'move':
-            self.direction = self.get_player_dist_direct(player)[1]
+            # The flow field shared by all enemies knows the way around obstacles
+            if self.flow_field:
+                direction = self.flow_field.steer(self.hitbox.center, direction)
+            self.direction = direction
         else:
             self.direction = pygame.math.Vector2()
 
-    def animate(self):
+    def animate(self, dt=1.0):
         animation = self.animations[self.status]
 
         # Loop over frame_index
-        self.frame_index += self.animation_speed
+        self.frame_index += self.animation_speed * dt
         if self.frame_index >= len(animation):
             if self.status == 'attack':
                 self.isAttacking = True
@@ -105,14 +113,14 @@ class Enemy(Entity):
         self.image = animation[int(self.frame_index)]
         self.rect = self.image.get_rect(center=self.hitbox.center)
 
+        # Frames are shared by every enemy of this kind, the faded ones come from the effects cache
         if self.isInvincible:
-            alpha = self.wave_value()
-            self.image.set_alpha(alpha)
+            self.image = effects.faded(self.image, self.wave_value())
         else:
-            self.image.set_alpha(225)
+            self.image = effects.faded(self.image, 225)
 
     def cooldowns(self):
-        current_time = pygame.time.get_ticks()
+        current_time = runtime.get_ticks()
         if self.isAttacking:
             if current_time - self.attack_time >= self.attacking_CD:
                 self.isAttacking = False
@@ -123,33 +131,38 @@ class Enemy(Entity):
 
     def get_damage(self, player, attack_type):
         if not self.isInvincible:
-            self.hit_sound.play()
+            self.hit_sound.play(self.rect.center)
             self.direction = self.get_player_dist_direct(player)[1]
             if attack_type == 'weapon':
                 self.health -= player.get_full_weapon_damage()
             else:
                 self.health -= player.get_full_skill_damage()
-            self.hit_time = pygame.time.get_ticks()
+            self.hit_time = runtime.get_ticks()
             self.isInvincible = True
 
     def check_death(self):
         if self.health <= 0:
             self.trigger_death_particles(self.rect.center, self.monster_name)
             self.add_exp(self.exp)
-            self.death_sound.play()
+            self.death_sound.play(self.rect.center)
             self.kill()
 
     def hit_reaction(self):
         if self.isInvincible:
             self.direction *= -self.resistance
 
-    def update(self):
-        self.move(self.speed)
-        self.animate()
+    def update(self, dt=1.0):
+        # Enemies ticked less often move and animate several frames worth at once
+        self.move(self.speed * dt)
+        self.animate(dt)
         self.cooldowns()
 
-    def enemy_update(self, player):
-        self.get_status(player)
-        self.actions(player)
+    def enemy_update(self, player, status=None, direction=None):
+        # The enemy batch passes in what it worked out for all enemies at once
+        if status is None:
+            distance, direction = self.get_player_dist_direct(player)
+            status = self.get_status(distance)
+        self.set_status(status)
+        self.actions(direction)
         self.check_death()
         self.hit_reaction()
\ No newline at end of file
@@ -1,5 +1,7 @@
 import pygame
-from math import sin
+from runtime import runtime
+from effects import flicker_alpha
+from collision import move_hitbox
 
 
 class Entity(pygame.sprite.Sprite):
@@ -8,36 +10,24 @@ class Entity(pygame.sprite.Sprite):
         self.frame_index = 0
         self.animation_speed = 0.15
         self.direction = pygame.math.Vector2()
+        self.remainder = pygame.math.Vector2()
 
     def move(self, speed):
-        if self.direction.magnitude() != 0:
+        # Full speed at most, crowding enemies can be slowed down by a shorter direction
+        if self.direction.magnitude() > 1:
             self.direction = self.direction.normalize()
-        self.hitbox.x += self.direction.x * speed
-        self.collision('horizontal')
-        self.hitbox.y += self.direction.y * speed
-        self.collision('vertical')
-        self.rect.center = self.hitbox.center
 
-    def collision(self, direction):
-        if direction == 'horizontal':
-            for sprite in self.obstacle_sprites:
-                if sprite.hitbox.colliderect(self.hitbox):
-                    if self.direction.x > 0:  # Moving right
-                        self.hitbox.right = sprite.hitbox.left
-                    else: #self.direction.x < 0  # Moving left
-                        self.hitbox.left = sprite.hitbox.right
+        # Hitboxes move in whole pixels, the fractions are carried over so short steps still add up
+        motion = self.direction * speed + self.remainder
+        dx, dy = int(motion.x), int(motion.y)
+        hit_x, hit_y = self.collision(dx, dy)
+        self.remainder.x = 0 if hit_x else motion.x - dx
+        self.remainder.y = 0 if hit_y else motion.y - dy
+        self.rect.center = self.hitbox.center
 
-        if direction == 'vertical':
-            for sprite in self.obstacle_sprites:
-                if sprite.hitbox.colliderect(self.hitbox):
-                    if self.direction.y > 0:  # Moving down
-                        self.hitbox.bottom = sprite.hitbox.top
-                    else: #self.direction.y < 0:  # Moving up
-                        self.hitbox.top = sprite.hitbox.bottom
+    def collision(self, dx, dy):
+        # Swept against the obstacle grid, fast entities stop at walls instead of passing through
+        return move_hitbox(self.hitbox, dx, dy, self.obstacle_sprites)
 
     def wave_value(self):
-        value = sin(pygame.time.get_ticks())
-        if value >= 0:
-            return 255
-        else:
-            return 0
\ No newline at end of file
+        return flicker_alpha(runtime.get_ticks())
\ No newline at end of file
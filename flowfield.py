@@ -0,0 +1,102 @@
+from collections import deque
+import pygame
+from settings import *
+from profiler import profiler
+
+BLOCKING_LAYERS = ('boundary', 'object', 'grass')
+STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+class FlowField:
+    def __init__(self, layouts, radius=FLOW_RADIUS):
+        # Walkable cells come from the map layers, so it also covers the parts of a streamed world not loaded yet
+        self.rows = layouts['boundary'].rows
+        self.cols = layouts['boundary'].cols
+        self.radius = radius
+        self.blocked = bytearray(self.rows * self.cols)
+        for style in BLOCKING_LAYERS:
+            for row_index, col_index, tile_id in layouts[style].tiles():
+                self.blocked[row_index * self.cols + col_index] = 1
+
+        # Steps from each cell near the target back to it, rebuilt only when the target cell or the map changes
+        self.target = None
+        self.distances = {}
+        self.dirty = False
+
+    def cell_of(self, pos):
+        return int(pos[0] // TILESIZE), int(pos[1] // TILESIZE)
+
+    def set_target(self, pos):
+        cell = self.cell_of(pos)
+        if cell != self.target:
+            self.target = cell
+            self.dirty = True
+
+    def open_cell(self, pos):
+        # Cut grass no longer blocks the way, the field only has to change if the cell was in reach
+        col, row = self.cell_of(pos)
+        index = row * self.cols + col
+        if self.blocked[index]:
+            self.blocked[index] = 0
+            if self.target and max(abs(col - self.target[0]), abs(row - self.target[1])) <= self.radius:
+                self.dirty = True
+
+    def build(self):
+        # Breadth first from the target out to radius steps, the rest of the map is left alone
+        cols, rows, blocked = self.cols, self.rows, self.blocked
+        self.distances = distances = {}
+        target_col, target_row = self.target
+        if not (0 <= target_col < cols and 0 <= target_row < rows):
+            return
+
+        start = target_row * cols + target_col
+        distances[start] = 0
+        frontier = deque([start])
+        while frontier:
+            index = frontier.popleft()
+            distance = distances[index] + 1
+            if distance > self.radius:
+                break
+            row, col = divmod(index, cols)
+            for neighbour, inside in (
+                    (index - 1, col > 0), (index + 1, col < cols - 1),
+                    (index - cols, row > 0), (index + cols, row < rows - 1)):
+                if inside and not blocked[neighbour] and neighbour not in distances:
+                    distances[neighbour] = distance
+                    frontier.append(neighbour)
+        profiler.count('flow_cells', len(distances))
+
+    def steer(self, pos, direction):
+        # Heads for the neighbouring cell closest to the target, direction is kept when there is no better way
+        if self.dirty:
+            with profiler.scope('flow'):
+                self.build()
+            self.dirty = False
+
+        col, row = self.cell_of(pos)
+        distance = self.distances.get(row * self.cols + col) if 0 <= col < self.cols else None
+        if distance is None or distance <= 1:
+            # Out of reach, walled off or already next to the target
+            return direction
+
+        distances = self.distances
+        best = None
+        for step_col, step_row in STEPS:
+            next_col = col + step_col
+            if not 0 <= next_col < self.cols:
+                continue
+            next_distance = distances.get((row + step_row) * self.cols + next_col)
+            if next_distance is None or next_distance >= distance:
+                continue
+            # No cutting corners past blocked cells
+            if step_col and step_row and (
+                    (row * self.cols + next_col) not in distances or
+                    ((row + step_row) * self.cols + col) not in distances):
+                continue
+            best = (next_col, row + step_row)
+            distance = next_distance
+
+        if best is None:
+            return direction
+        heading = pygame.math.Vector2((best[0] + 0.5) * TILESIZE - pos[0], (best[1] + 0.5) * TILESIZE - pos[1])
+        return heading.normalize() if heading.length_squared() else direction
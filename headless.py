@@ -0,0 +1,124 @@
+import os
+import json
+import random
+import argparse
+from time import perf_counter
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+from settings import *
+from runtime import runtime, KeyState
+from assets import asset_manager
+from profiler import profiler
+
+# The keys the game reacts to, menu toggle included
+CONTROL_KEYS = (
+    pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT,
+    pygame.K_SPACE, pygame.K_LCTRL, pygame.K_q, pygame.K_e, pygame.K_m)
+
+
+class RandomInput:
+    def __init__(self, seed=0, hold=20, menu_chance=0.02):
+        self.rng = random.Random(seed)
+        self.hold = hold
+        self.menu_chance = menu_chance
+        self.keys = KeyState()
+
+    def get_keys(self, frame):
+        # A new pair of keys every few frames, the menu only now and then
+        if frame % self.hold == 0:
+            pressed = set(self.rng.sample(CONTROL_KEYS[:-1], 2))
+            if self.rng.random() < self.menu_chance:
+                pressed.add(pygame.K_m)
+            self.keys = KeyState(pressed)
+        return self.keys
+
+
+class ScriptedInput:
+    def __init__(self, script):
+        # script is a list of (frame, key names) pairs, the keys stay held until the next entry
+        pygame.init()
+        self.script = [(frame, KeyState(pygame.key.key_code(name) for name in names)) for frame, names in script]
+        self.script.sort(key=lambda entry: entry[0])
+        self.index = 0
+        self.keys = KeyState()
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as script_file:
+            return cls(json.load(script_file))
+
+    def get_keys(self, frame):
+        while self.index < len(self.script) and self.script[self.index][0] <= frame:
+            self.keys = self.script[self.index][1]
+            self.index += 1
+        return self.keys
+
+
+class HeadlessGame:
+    def __init__(self, input_source, seed=0, streaming=STREAMING, frame_time=1000 / SIM_FPS):
+        # Same setup as main.Game, without a window, sound or real time
+        pygame.init()
+        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        random.seed(seed)
+        runtime.simulate()
+        asset_manager.load_atlas()
+
+        from level import Level
+        self.level = Level(streaming)
+
+        self.input_source = input_source
+        self.frame_time = frame_time
+        self.dt = frame_time * BASE_FPS / 1000
+        self.frame = 0
+        self.menu_held = False
+
+    def step(self):
+        profiler.start_frame()
+        keys = self.input_source.get_keys(self.frame)
+
+        # Main toggles the menu on the key down event, not while the key is held
+        if keys[pygame.K_m] and not self.menu_held:
+            self.level.toggle_menu()
+        self.menu_held = keys[pygame.K_m]
+        runtime.keys = keys
+
+        self.level.run(self.dt)
+        profiler.end_frame()
+        runtime.advance(self.frame_time)
+        self.frame += 1
+
+    def run(self, frames):
+        start = perf_counter()
+        for _ in range(frames):
+            self.step()
+        return perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run ZelSoul without a window at a fixed timestep, as fast as possible')
+    parser.add_argument('--frames', type=int, default=3600)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--script', help='JSON list of [frame, [key names]] to play instead of random input')
+    parser.add_argument('--streaming', action='store_true', help='load the world in chunks around the player')
+    parser.add_argument('--profile', help='write per frame profiler records to this JSON lines file')
+    args = parser.parse_args()
+
+    input_source = ScriptedInput.from_file(args.script) if args.script else RandomInput(args.seed)
+    game = HeadlessGame(input_source, args.seed, args.streaming or STREAMING)
+    if args.profile:
+        profiler.start_dump(args.profile)
+    elapsed = game.run(args.frames)
+    profiler.stop_dump()
+
+    player = game.level.player
+    simulated = args.frames / SIM_FPS
+    print(f'{args.frames} frames in {elapsed:.2f} s, {args.frames / elapsed:.0f} fps, {elapsed / args.frames * 1000:.3f} ms per frame')
+    print(f'{simulated:.0f} s of game time, {simulated / elapsed:.1f}x real time')
+    print(f'player at {player.rect.center} with {player.health} health and {player.exp} exp')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import pygame
+from heapq import merge
 from settings import *
 from tile import Tile
 from player import Player
@@ -11,22 +12,43 @@ from enemy import Enemy
 from particles import AnimationPlayer
 from skill import SkillPlayer
 from upgrade import Upgrade
+from assets import asset_manager
+from runtime import runtime
+from manifest import frame_manifest
+from spatial import SpatialHash
+from chunks import StaticLayer
+from mapfile import load_map
+from world import WorldStreamer, PLAYER_TILE
+from scheduler import EnemyScheduler
+from flowfield import FlowField
+from tilemap import TileMap, SOLID
+from profiler import profiler
+from sfx import sfx
+
+
+ENTITY_KINDS = (Player, Enemy, Weapon)
 
 
 class Level:
-    def __init__(self):
+    def __init__(self, streaming=STREAMING):
         # Basic Setup
         self.display_surface = pygame.display.get_surface()
         self.game_paused = False
+        self.streaming = streaming
+        self.world = None
+
+        # Dirty rects, the changed parts of the screen after run(), None for all of it
+        self.dirty_rects = None
+        self.world_snapshot = None
 
         # Sprite group setup
         self.visible_sprites = YSortCameraGroup()
-        self.obstacle_sprites = pygame.sprite.Group()
+        self.obstacle_sprites = ObstacleGroup()
 
         # Attack sprites
         self.current_weapon = None
         self.attack_sprites = pygame.sprite.Group()
-        self.attackable_sprites = pygame.sprite.Group()
+        self.attackable_sprites = AttackableGroup()
 
         # Sprite setup
         self.create_map()
@@ -38,69 +60,87 @@ class Level:
         # Particles
         self.animation_player = AnimationPlayer()
         self.skill_player = SkillPlayer(self.animation_player)
+        self.visible_sprites.particles = self.animation_player
+
+        # Keep the frame order found this launch so the next one can skip the folder scans
+        frame_manifest.save()
 
     def create_map(self):
-        layouts = {
-            'boundary': import_csv_layout('../map/map_FloorBlocks.csv'),
-            'grass': import_csv_layout('../map/map_Grass.csv'),
-            'object': import_csv_layout('../map/map_LargeObjects.csv'),
-            'entities': import_csv_layout('../map/map_Entities.csv')
-        }
+        layouts = load_map()
+        self.flow_field = FlowField(layouts)
+
+        # The boundary only ever blocks movement, it is kept as a tile map instead of invisible sprites
+        self.obstacle_sprites.tilemap = TileMap.from_layer(layouts['boundary'])
 
-        graphics = {
-            'grass': import_folder('../graphics/grass'),
-            'object': import_folder('../graphics/objects')
+        # Floor and details never change, they are baked into chunks instead of sprites
+        self.visible_sprites.floor = StaticLayer([
+            (layouts['floor'], '../graphics/tilemap/Floor.png'),
+            (layouts['details'], '../graphics/tilemap/details.png')
+        ], bake_all=not self.streaming)
+
+        self.graphics = {
+            'grass': asset_manager.frames('../graphics/grass'),
+            'object': asset_manager.frames('../graphics/objects')
         }
 
-        for style, layout in layouts.items():
-            for row_index, row in enumerate(layout):
-                for col_index, col in enumerate(row):
-                    if col != '-1':
-                        x = col_index * TILESIZE
-                        y = row_index * TILESIZE
-                        if style == 'boundary':
-                            Tile((x, y), [self.obstacle_sprites], 'invisible')
-                        elif style == 'grass':
-                            # Create a grass tile
-                            Tile(
-                                (x, y),
-                                [self.visible_sprites, self.obstacle_sprites, self.attackable_sprites],
-                                'grass',
-                                surface=choice(graphics['grass']))
-                        elif style == 'object':
-                            # Create object tile
-                            Tile((x, y), [self.visible_sprites, self.obstacle_sprites], 'object', surface=graphics['object'][int(col)])
-                        elif style == 'entities':
-                            if col == '394':
-                                self.player = Player(
-                                    (x, y),
-                                    [self.visible_sprites],
-                                    self.obstacle_sprites,
-                                    self.create_weapon,
-                                    self.destroy_weapon,
-                                    self.create_skill)
-                            else:
-                                if col == '390': monster_name = 'bamboo'
-                                elif col == '391': monster_name = 'spirit'
-                                elif col == '392': monster_name = 'raccoon'  # possibly offset x y coordinates, big sprite
-                                else: monster_name = 'squid'
-                                Enemy(
-                                    monster_name,
-                                    (x, y),
-                                    [self.visible_sprites, self.attackable_sprites],
-                                    self.obstacle_sprites,
-                                    self.damage_player,
-                                    self.trigger_death_particles,
-                                    self.add_exp)
+        if self.streaming:
+            # Only the player exists up front, the world around it is loaded chunk by chunk
+            for row_index, col_index, tile_id in layouts['entities'].tiles():
+                if tile_id == PLAYER_TILE:
+                    self.create_tile('entities', row_index, col_index, tile_id)
+            self.world = WorldStreamer(layouts, self.create_tile, self.visible_sprites.floor)
+            self.world.update(self.player)
+        else:
+            for style in ('grass', 'object', 'entities'):
+                for row_index, col_index, tile_id in layouts[style].tiles():
+                    self.create_tile(style, row_index, col_index, tile_id)
+
+    def create_tile(self, style, row_index, col_index, tile_id, surface=None):
+        x = col_index * TILESIZE
+        y = row_index * TILESIZE
+        if style == 'grass':
+            # Create a grass tile
+            return Tile(
+                (x, y),
+                [self.visible_sprites, self.obstacle_sprites, self.attackable_sprites],
+                'grass',
+                surface=surface or choice(self.graphics['grass']))
+        elif style == 'object':
+            # Create object tile
+            return Tile((x, y), [self.visible_sprites, self.obstacle_sprites], 'object', surface=self.graphics['object'][tile_id])
+        elif style == 'entities':
+            if tile_id == PLAYER_TILE:
+                self.player = Player(
+                    (x, y),
+                    [self.visible_sprites],
+                    self.obstacle_sprites,
+                    self.create_weapon,
+                    self.destroy_weapon,
+                    self.create_skill)
+                return self.player
+            else:
+                if tile_id == 390: monster_name = 'bamboo'
+                elif tile_id == 391: monster_name = 'spirit'
+                elif tile_id == 392: monster_name = 'raccoon'  # possibly offset x y coordinates, big sprite
+                else: monster_name = 'squid'
+                return Enemy(
+                    monster_name,
+                    (x, y),
+                    [self.visible_sprites, self.attackable_sprites],
+                    self.obstacle_sprites,
+                    self.damage_player,
+                    self.trigger_death_particles,
+                    self.add_exp,
+                    self.flow_field)
 
     def create_weapon(self):
         self.current_weapon = Weapon(self.player, [self.visible_sprites, self.attack_sprites])
 
     def create_skill(self, style, strength, cost):
         if style == 'heal':
-            self.skill_player.heal(self.player, strength, cost, [self.visible_sprites])
+            self.skill_player.heal(self.player, strength, cost)
         elif style == 'flame':
-            self.skill_player.flame(self.player, cost, [self.visible_sprites, self.attack_sprites])
+            self.skill_player.flame(self.player, cost)
 
     def destroy_weapon(self):
         if self.current_weapon:
@@ -108,46 +148,172 @@ class Level:
         self.current_weapon = None
 
     def player_attack_logic(self):
-        if self.attack_sprites:
-            for attack_sprite in self.attack_sprites:
-                collision_sprites = pygame.sprite.spritecollide(attack_sprite, self.attackable_sprites, False)
-                if collision_sprites:
-                    for target_sprite in collision_sprites:
-                        if target_sprite.sprite_type == 'grass':
-                            pos = target_sprite.rect.center
-                            offset = pygame.math.Vector2(0, 75)
-                            for leaf in range(randint(3, 6)):
-                                self.animation_player.create_grass_particles(pos - offset, [self.visible_sprites])
-                            target_sprite.kill()
-                        else:
-                            target_sprite.get_damage(self.player, attack_sprite.sprite_type)
+        # Flames live in the particle pool, they hit like the skill sprites they used to be
+        attacks = [(attack_sprite.rect, attack_sprite.sprite_type) for attack_sprite in self.attack_sprites]
+        attacks += [(attack_rect, 'skill') for attack_rect in self.animation_player.attack_rects()]
+        if attacks:
+            self.attackable_sprites.refresh()
+        for attack_rect, attack_type in attacks:
+            self.attack_targets(attack_rect, attack_type)
+
+    def attack_targets(self, attack_rect, attack_type):
+        for target_sprite in self.attackable_sprites.query(attack_rect):
+            if isinstance(target_sprite, Tile):
+                pos = target_sprite.rect.center
+                offset = pygame.math.Vector2(0, 75)
+                for leaf in range(randint(3, 6)):
+                    self.animation_player.create_grass_particles(pos - offset)
+                self.flow_field.open_cell(target_sprite.rect.topleft)
+                target_sprite.kill()
+            else:
+                target_sprite.get_damage(self.player, attack_type)
 
     def damage_player(self, amount, attack_type):
         if not self.player.isInvincible:
             self.player.health -= amount
             self.player.isInvincible = True
-            self.player.hit_time = pygame.time.get_ticks()
+            self.player.hit_time = runtime.get_ticks()
             # Particles
-            self.animation_player.create_particles(attack_type, self.player.rect.center, [self.visible_sprites])
+            self.animation_player.create_particles(attack_type, self.player.rect.center)
 
     def trigger_death_particles(self, pos, particle_type):
-        self.animation_player.create_particles(particle_type, pos, [self.visible_sprites])
+        self.animation_player.create_particles(particle_type, pos)
 
     def add_exp(self, amount):
         self.player.exp += amount
 
     def toggle_menu(self):
         self.game_paused = not self.game_paused
+        self.invalidate()
 
-    def run(self):
-        self.visible_sprites.custom_draw(self.player)
-        self.ui.display(self.player)
+    def invalidate(self):
+        # The next frame is drawn and pushed to the window whole, for when something drew over the screen
+        self.world_snapshot = None
+        self.visible_sprites.invalidate()
+
+    def draw(self, alpha=None):
+        # Returns the screen rects that changed, None when the whole screen has to go to the window.
+        # alpha is how far the clock is into the next simulation step, to draw moving sprites in between
+        if self.world_snapshot is not None and not profiler.overlay:
+            # The world is frozen behind the menu, only the parts of the menu and HUD that changed are drawn
+            with profiler.scope('ui'):
+                dirty_rects = self.ui.display(self.player, self.world_snapshot)
+            with profiler.scope('upgrade'):
+                dirty_rects += self.upgrade.display(force=False)
+            return dirty_rects
+
+        self.display_surface.fill(WATER_COLOR)
+        with profiler.scope('draw'):
+            self.visible_sprites.custom_draw(self.player, alpha)
+        if self.game_paused and DIRTY_RECTS:
+            self.world_snapshot = self.display_surface.copy()
+        with profiler.scope('ui'):
+            hud_rects = self.ui.display(self.player)
         if self.game_paused:
-            self.upgrade.display()
+            with profiler.scope('upgrade'):
+                self.upgrade.display()
+            return None
+
+        if not DIRTY_RECTS or self.visible_sprites.dirty_rects is None:
+            return None
+        return self.visible_sprites.dirty_rects + hud_rects
+
+    def update(self, dt=1.0):
+        # dt is the step length in frames of BASE_FPS
+        if not self.game_paused:
+            sfx.listen(self.player.rect.center)
+            if INTERPOLATE:
+                self.visible_sprites.store_positions()
+            with profiler.scope('update'):
+                self.animation_player.update(dt)
+                self.visible_sprites.update(dt)
+            with profiler.scope('enemies'):
+                self.flow_field.set_target(self.player.hitbox.center)
+                self.visible_sprites.enemy_update(self.player, dt)
+            with profiler.scope('attacks'):
+                self.player_attack_logic()
+        if self.world:
+            with profiler.scope('world'):
+                self.world.update(self.player)
+            # What streaming keeps in memory, it stays bounded however big the map is
+            if profiler.enabled:
+                profiler.count('chunks', len(self.world.loaded))
+                profiler.count('streamed_sprites', self.world.loaded_sprites())
+        profiler.count('particles', self.animation_player.pool.count)
+
+    def run(self, dt=1.0):
+        self.dirty_rects = self.draw()
+        self.update(dt)
+
+
+class ObstacleGroup(pygame.sprite.Group):
+    def __init__(self):
+        super().__init__()
+        # Obstacles never move, so their hitboxes are indexed once when added
+        self.grid = SpatialHash(TILESIZE)
+        self.tilemap = None
+
+    def add_internal(self, sprite, *args):
+        super().add_internal(sprite, *args)
+        self.grid.insert(sprite, sprite.hitbox)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.grid.remove(sprite)
+
+    def query(self, rect):
+        # Sprites from the grid and the solid cells of the tile map, in one walk over the covered cells.
+        # The tile map has no query of its own, so the cell range and bounds live only here
+        tilemap = self.tilemap
+        if tilemap is None:
+            return self.grid.query(rect)
+        left, top, right, bottom = self.grid.cell_range(rect)
+        grid_cells = self.grid.cells
+        cols, rows, flags = tilemap.cols, tilemap.rows, tilemap.flags
+        found = {}
+        for row in range(top, bottom + 1):
+            inside = 0 <= row < rows
+            for col in range(left, right + 1):
+                cell = grid_cells.get((col, row))
+                if cell:
+                    for sprite in cell:
+                        found[sprite] = None
+                if inside and 0 <= col < cols and flags[row * cols + col] & SOLID:
+                    found[tilemap.block_at(row * cols + col)] = None
+        return list(found)
+
+
+class AttackableGroup(pygame.sprite.Group):
+    def __init__(self):
+        super().__init__()
+        # Grass is indexed once when added, enemies again whenever they have moved since the last refresh
+        self.grid = SpatialHash(TILESIZE)
+        self.moving = {}
+
+    def add_internal(self, sprite, *args):
+        super().add_internal(sprite, *args)
+        if isinstance(sprite, Tile):
+            self.grid.insert(sprite, sprite.rect)
         else:
-            self.visible_sprites.update()
-            self.visible_sprites.enemy_update(self.player)
-            self.player_attack_logic()
+            # Enemies join their groups before they have a rect
+            self.moving[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.grid.remove(sprite)
+        self.moving.pop(sprite, None)
+
+    def refresh(self):
+        for sprite, indexed in self.moving.items():
+            if sprite.rect != indexed:
+                self.grid.insert(sprite, sprite.rect)
+                self.moving[sprite] = tuple(sprite.rect)
+
+    def query(self, rect):
+        # Only the targets overlapping rect, found from the cells it covers
+        candidates = self.grid.query(rect)
+        profiler.count('attack_checks', len(candidates))
+        return [sprite for sprite in candidates if rect.colliderect(sprite.rect)]
 
 
 class YSortCameraGroup(pygame.sprite.Group):
@@ -158,26 +324,162 @@ class YSortCameraGroup(pygame.sprite.Group):
         self.half_width = self.display_surface.get_size()[0] // 2
         self.half_height = self.display_surface.get_size()[1] // 2
         self.offset = pygame.math.Vector2(100, 200)
+        self.camera_rect = self.display_surface.get_rect()
+
+        # Baked floor chunks and the particle pool, set up by the level
+        self.floor = None
+        self.particles = None
+
+        # Where the moving sprites were before the last simulation step, for drawing in between
+        self.previous_positions = {}
+
+        # Dirty rects, what moved on screen while the camera stood still
+        self.last_camera = None
+        self.drawn_rects = []
+        self.changed_rects = []
+        self.dirty_rects = None
 
-        # Creating the floor
-        self.floor_surf = pygame.image.load('../graphics/tilemap/ground.png').convert()
-        self.floor_rect = self.floor_surf.get_rect(topleft=(0, 0))
+        # Static tiles are bucketed by the cell of their center, every bucket kept sorted by y
+        self.static_cells = {}
+        self.static_margin = [0, 0]
+        self.dynamic_sprites = {}
+
+        # The moving sprites again by class, kept up to date as they come and go, so systems only walk their own kind
+        self.entities = {kind: {} for kind in ENTITY_KINDS + (pygame.sprite.Sprite,)}
+
+        # Enemies are updated by the scheduler, depending on how far they are from the player
+        self.enemy_scheduler = EnemyScheduler()
+
+    def add_internal(self, sprite, *args):
+        super().add_internal(sprite, *args)
+        if isinstance(sprite, Tile):
+            key = (sprite.rect.centerx // TILESIZE, sprite.rect.centery // TILESIZE)
+            cell = self.static_cells.setdefault(key, [])
+            cell.append(sprite)
+            cell.sort(key=y_sort_key)
+
+            # Tiles can reach past their own cell, the query widens by the largest overhang
+            self.static_margin[0] = max(self.static_margin[0], sprite.rect.width // 2)
+            self.static_margin[1] = max(self.static_margin[1], sprite.rect.height // 2)
+            self.changed_rects.append(sprite.rect.copy())
+        else:
+            self.dynamic_sprites[sprite] = None
+            self.entities[entity_kind(sprite)][sprite] = None
+            if isinstance(sprite, Enemy):
+                self.enemy_scheduler.add(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if isinstance(sprite, Tile):
+            key = (sprite.rect.centerx // TILESIZE, sprite.rect.centery // TILESIZE)
+            cell = self.static_cells[key]
+            cell.remove(sprite)
+            if not cell:
+                del self.static_cells[key]
+            self.changed_rects.append(sprite.rect.copy())
+        else:
+            del self.dynamic_sprites[sprite]
+            del self.entities[entity_kind(sprite)][sprite]
 
-    def custom_draw(self, player):
+    def visible_static_sprites(self):
+        camera_rect = self.camera_rect
+        left = (camera_rect.left - self.static_margin[0]) // TILESIZE
+        right = (camera_rect.right + self.static_margin[0]) // TILESIZE
+        top = (camera_rect.top - self.static_margin[1]) // TILESIZE
+        bottom = (camera_rect.bottom + self.static_margin[1]) // TILESIZE
+
+        # Rows are walked top to bottom and merged per row, so the result comes out y-sorted
+        for row in range(top, bottom + 1):
+            cells = [self.static_cells[(col, row)] for col in range(left, right + 1) if (col, row) in self.static_cells]
+            for sprite in merge(*cells, key=y_sort_key):
+                if sprite.rect.colliderect(camera_rect):
+                    yield sprite
+
+    def visible_dynamic_sprites(self):
+        camera_rect = self.camera_rect
+        visible = [sprite for sprite in self.dynamic_sprites if sprite.rect.colliderect(camera_rect)]
+        visible.sort(key=y_sort_key)
+        return visible
+
+    def store_positions(self):
+        self.previous_positions = {sprite: sprite.rect.center for sprite in self.dynamic_sprites}
+
+    def lag(self, sprite, alpha):
+        # How far behind its simulated position the sprite is drawn
+        previous = self.previous_positions.get(sprite)
+        if alpha is None or previous is None:
+            return 0, 0
+        return (previous[0] - sprite.rect.centerx) * (1 - alpha), (previous[1] - sprite.rect.centery) * (1 - alpha)
+
+    def custom_draw(self, player, alpha=None):
         # Getting the offset
-        self.offset.x = player.rect.centerx - self.half_width
-        self.offset.y = player.rect.centery - self.half_height
+        lag_x, lag_y = self.lag(player, alpha)
+        self.offset.x = int(player.rect.centerx + lag_x) - self.half_width
+        self.offset.y = int(player.rect.centery + lag_y) - self.half_height
+        self.camera_rect.topleft = self.offset
+        camera_still = self.camera_rect.topleft == self.last_camera
+        self.last_camera = self.camera_rect.topleft
 
         # Drawing the floor
+        if self.floor:
+            with profiler.scope('floor'):
+                profiler.count('blits', self.floor.draw(self.display_surface, self.camera_rect))
+
+        # Only sprites on screen are gathered, static ones come pre-sorted
+        with profiler.scope('sprites'):
+            drawn = 0
+            drawn_rects = []
+            sprites = merge(self.visible_static_sprites(), self.visible_dynamic_sprites(), key=y_sort_key)
+            for sprite in sprites:
+                offset_pos = sprite.rect.topleft - self.offset
+                if sprite in self.dynamic_sprites:
+                    if alpha is not None:
+                        offset_pos += self.lag(sprite, alpha)
+                    drawn_rects.append(self.display_surface.blit(sprite.image, offset_pos))
+                else:
+                    self.display_surface.blit(sprite.image, offset_pos)
+                drawn += 1
+        profiler.count('blits', drawn)
+        profiler.count('drawn', drawn)
+        profiler.count('culled', len(self) - drawn)
+
+        # Particles are drawn over the sprites in one batch
+        if self.particles:
+            with profiler.scope('particles'):
+                particle_rects = self.particles.draw(self.display_surface, self.camera_rect)
+            drawn_rects += particle_rects
+            profiler.count('blits', len(particle_rects))
+
+        # With the camera still only where moving things were and are now changed, plus tiles added or removed
+        if camera_still:
+            self.dirty_rects = self.drawn_rects + drawn_rects
+            self.dirty_rects += [rect.move(-self.camera_rect.left, -self.camera_rect.top) for rect in self.changed_rects]
+        else:
+            self.dirty_rects = None
+        self.drawn_rects = drawn_rects
+        self.changed_rects = []
+
+    def invalidate(self):
+        # The next frame is pushed to the window whole
+        self.last_camera = None
+
+    def update(self, *args):
+        # Tiles and weapons never change, enemies are left to enemy_update
+        for kind in (Player, pygame.sprite.Sprite):
+            for sprite in list(self.entities[kind]):
+                sprite.update(*args)
+
+    def enemy_update(self, player, dt=1.0):
+        self.enemy_scheduler.update(list(self.entities[Enemy]), player, dt)
+
 
-        floor_offset_pos = self.floor_rect.topleft - self.offset
-        self.display_surface.blit(self.floor_surf, floor_offset_pos)
+def entity_kind(sprite):
+    # Anything else that moves goes in one generic bucket
+    for kind in ENTITY_KINDS:
+        if isinstance(sprite, kind):
+            return kind
+    return pygame.sprite.Sprite
 
-        for sprite in sorted(self.sprites(), key=lambda sprite: sprite.rect.centery):
-            offset_pos = sprite.rect.topleft - self.offset
-            self.display_surface.blit(sprite.image, offset_pos)
 
-    def enemy_update(self, player):
-        enemy_sprites = [sprite for sprite in self.sprites() if hasattr(sprite, 'sprite_type') and sprite.sprite_type == 'enemy']
-        for sprite in enemy_sprites:
-            sprite.enemy_update(player)
\ No newline at end of file
+def y_sort_key(sprite):
+    return sprite.rect.centery
\ No newline at end of file
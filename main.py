@@ -1,6 +1,10 @@
 import pygame, sys
 from settings import *
 from level import Level
+from assets import asset_manager
+from profiler import profiler
+from runtime import runtime
+from sfx import sfx
 
 
 class Game:
@@ -11,16 +15,23 @@ class Game:
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption('ZelSoul')
         self.clock = pygame.time.Clock()
+        asset_manager.load_atlas()
 
         self.level = Level()
 
         # Sound
-        main_sound = pygame.mixer.Sound('../audio/main.ogg')
-        main_sound.set_volume(0.5)
+        main_sound = sfx.effect('../audio/main.ogg', 0.5, 'ambience', limit=1)
         main_sound.play(loops=-1)
 
     def run(self):
+        # The simulation advances in fixed steps of the real time passed, the screen is drawn once per frame
+        step_time = 1000 / SIM_FPS
+        dt = BASE_FPS / SIM_FPS
+        accumulator = step_time
+        runtime.ticks = pygame.time.get_ticks()
+
         while True:
+            profiler.start_frame()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     pygame.quit()
@@ -28,11 +39,28 @@ class Game:
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_m:
                         self.level.toggle_menu()
+                    if event.key == pygame.K_F3:
+                        profiler.toggle_overlay()
+                        self.level.invalidate()
+                    if event.key == pygame.K_F4:
+                        profiler.toggle_dump()
+
+            while accumulator >= step_time:
+                runtime.advance(step_time)
+                self.level.update(dt)
+                accumulator -= step_time
+            dirty_rects = self.level.draw(accumulator / step_time if INTERPOLATE else None)
 
-            self.screen.fill(WATER_COLOR)
-            self.level.run()
-            pygame.display.update()
-            self.clock.tick(FPS)
+            profiler.end_frame()
+            if profiler.overlay:
+                profiler.draw(self.screen)
+                dirty_rects = None
+            # None from draw() means the whole screen, which update(None) would skip
+            if dirty_rects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(dirty_rects)
+            accumulator += min(self.clock.tick(FPS), MAX_FRAME_TIME)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,76 @@
+import os
+import re
+import json
+
+MANIFEST_PATH = '../graphics/manifest.json'
+
+
+def natural_key(name):
+    # '10.png' sorts after '9.png' no matter the order the filesystem lists them in
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+
+class FrameManifest:
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.folders = None
+        self.checked = set()
+        self.changed = False
+
+    def load(self):
+        try:
+            with open(self.path) as manifest_file:
+                self.folders = json.load(manifest_file)
+        except (OSError, ValueError):
+            self.folders = {}
+
+    def is_fresh(self, folder, entry):
+        # A stat per file is enough to trust the recorded order, the folder is never listed
+        if os.stat(folder).st_mtime_ns != entry['mtime']:
+            return False
+        for name, size, mtime in entry['files']:
+            try:
+                stat = os.stat(folder + '/' + name)
+            except OSError:
+                return False
+            if stat.st_size != size or stat.st_mtime_ns != mtime:
+                return False
+        return True
+
+    def scan(self, folder):
+        files = []
+        for item in os.scandir(folder):
+            if item.is_file() and item.name.lower().endswith('.png'):
+                stat = item.stat()
+                files.append([item.name, stat.st_size, stat.st_mtime_ns])
+        files.sort(key=lambda file: natural_key(file[0]))
+        return {'mtime': os.stat(folder).st_mtime_ns, 'files': files}
+
+    def entry(self, folder):
+        if self.folders is None:
+            self.load()
+
+        key = os.path.normpath(folder).replace(os.sep, '/')
+        if key not in self.checked:
+            entry = self.folders.get(key)
+            if entry is None or not self.is_fresh(folder, entry):
+                self.folders[key] = self.scan(folder)
+                self.changed = True
+            self.checked.add(key)
+        return self.folders[key]
+
+    def files(self, folder):
+        return [folder + '/' + name for name, _, __ in self.entry(folder)['files']]
+
+    def save(self):
+        if self.changed:
+            try:
+                with open(self.path, 'w') as manifest_file:
+                    json.dump(self.folders, manifest_file, sort_keys=True, separators=(',', ':'))
+            except OSError:
+                # A read-only install simply rescans the changed folders next launch
+                pass
+            self.changed = False
+
+
+frame_manifest = FrameManifest()
@@ -0,0 +1,134 @@
+import os
+import sys
+import mmap
+import struct
+from array import array
+from support import import_csv_layout
+
+MAP_PATH = '../map/map.bin'
+MAP_LAYERS = {
+    'boundary': '../map/map_FloorBlocks.csv',
+    'grass': '../map/map_Grass.csv',
+    'object': '../map/map_LargeObjects.csv',
+    'entities': '../map/map_Entities.csv',
+    'floor': '../map/map_Floor.csv',
+    'details': '../map/map_Details.csv'
+}
+
+# Magic, version, layer count, rows, cols, then the layer names and one int16 grid per layer
+MAP_MAGIC = b'ZSMP'
+MAP_VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+
+
+class MapLayer:
+    def __init__(self, data, rows, cols):
+        # data is a flat row-major sequence of tile ids, -1 for empty cells
+        self.data = data
+        self.rows = rows
+        self.cols = cols
+
+    @classmethod
+    def from_rows(cls, layout):
+        cols = max(len(row) for row in layout)
+        data = array('h')
+        for row in layout:
+            data.extend(int(col) for col in row)
+            data.extend([-1] * (cols - len(row)))
+        return cls(memoryview(data), len(layout), cols)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, row_index):
+        start = row_index * self.cols
+        return self.data[start:start + self.cols]
+
+    def __iter__(self):
+        for row_index in range(self.rows):
+            yield self[row_index]
+
+    def tiles(self):
+        # Only the occupied cells, as (row, col, tile id)
+        cols = self.cols
+        for index, tile_id in enumerate(self.data):
+            if tile_id != -1:
+                row_index, col_index = divmod(index, cols)
+                yield row_index, col_index, tile_id
+
+
+def compile_map(layers=MAP_LAYERS, output=MAP_PATH):
+    grids = {name: MapLayer.from_rows(import_csv_layout(path)) for name, path in layers.items()}
+    rows = max(grid.rows for grid in grids.values())
+    cols = max(grid.cols for grid in grids.values())
+
+    with open(output, 'wb') as map_file:
+        map_file.write(HEADER.pack(MAP_MAGIC, MAP_VERSION, len(grids), rows, cols))
+        for name in grids:
+            encoded = name.encode()
+            map_file.write(struct.pack('<B', len(encoded)) + encoded)
+        if map_file.tell() % 2:
+            map_file.write(b'\0')
+
+        for grid in grids.values():
+            # Smaller layers are padded with empty cells to the size of the map
+            data = array('h', [-1] * (rows * cols))
+            for row_index in range(grid.rows):
+                data[row_index * cols:row_index * cols + grid.cols] = array('h', grid[row_index])
+            if sys.byteorder == 'big':
+                data.byteswap()
+            map_file.write(data.tobytes())
+    return output
+
+
+def read_compiled_map(path=MAP_PATH, mapped=False):
+    with open(path, 'rb') as map_file:
+        if mapped and sys.byteorder == 'little':
+            # The grids are read straight from the page cache, nothing is copied up front
+            buffer = memoryview(mmap.mmap(map_file.fileno(), 0, access=mmap.ACCESS_READ))
+        else:
+            buffer = memoryview(map_file.read())
+
+    magic, version, layer_count, rows, cols = HEADER.unpack_from(buffer, 0)
+    if magic != MAP_MAGIC or version != MAP_VERSION:
+        raise ValueError(f'{path} is not a version {MAP_VERSION} compiled map')
+
+    offset = HEADER.size
+    names = []
+    for _ in range(layer_count):
+        length = buffer[offset]
+        names.append(bytes(buffer[offset + 1:offset + 1 + length]).decode())
+        offset += 1 + length
+    offset += offset % 2
+
+    layers = {}
+    size = rows * cols * 2
+    for name in names:
+        raw = buffer[offset:offset + size]
+        if sys.byteorder == 'little':
+            data = raw.cast('h')
+        else:
+            data = array('h', bytes(raw))
+            data.byteswap()
+            data = memoryview(data)
+        layers[name] = MapLayer(data, rows, cols)
+        offset += size
+    return layers
+
+
+def map_is_compiled(path=MAP_PATH, layers=MAP_LAYERS):
+    if not os.path.exists(path):
+        return False
+    compiled_time = os.stat(path).st_mtime_ns
+    return all(os.stat(csv_path).st_mtime_ns <= compiled_time for csv_path in layers.values())
+
+
+def load_map(path=MAP_PATH, layers=MAP_LAYERS, mapped=False):
+    # The CSV layers stay the source of truth, a missing or outdated compiled map falls back to them
+    if map_is_compiled(path, layers):
+        return read_compiled_map(path, mapped)
+    return {name: MapLayer.from_rows(import_csv_layout(csv_path)) for name, csv_path in layers.items()}
+
+
+if __name__ == '__main__':
+    print(f'Compiled {len(MAP_LAYERS)} layers into {compile_map()}')
@@ -1,43 +1,45 @@
 import pygame
-from support import import_folder
+from settings import *
+from assets import asset_manager
 from random import choice
 
 
 class AnimationPlayer:
-    def __init__(self):
+    def __init__(self, cap=PARTICLE_CAP):
+        self.pool = ParticlePool(cap)
         self.frames = {
             # magic
-            'flame': import_folder('../graphics/particles/flame/frames'),
-            'aura': import_folder('../graphics/particles/aura'),
-            'heal': import_folder('../graphics/particles/heal/frames'),
+            'flame': asset_manager.frames('../graphics/particles/flame/frames'),
+            'aura': asset_manager.frames('../graphics/particles/aura'),
+            'heal': asset_manager.frames('../graphics/particles/heal/frames'),
 
             # attacks
-            'claw': import_folder('../graphics/particles/claw'),
-            'slash': import_folder('../graphics/particles/slash'),
-            'sparkle': import_folder('../graphics/particles/sparkle'),
-            'leaf_attack': import_folder('../graphics/particles/leaf_attack'),
-            'thunder': import_folder('../graphics/particles/thunder'),
+            'claw': asset_manager.frames('../graphics/particles/claw'),
+            'slash': asset_manager.frames('../graphics/particles/slash'),
+            'sparkle': asset_manager.frames('../graphics/particles/sparkle'),
+            'leaf_attack': asset_manager.frames('../graphics/particles/leaf_attack'),
+            'thunder': asset_manager.frames('../graphics/particles/thunder'),
 
             # monster deaths
-            'squid': import_folder('../graphics/particles/smoke_orange'),
-            'raccoon': import_folder('../graphics/particles/raccoon'),
-            'spirit': import_folder('../graphics/particles/nova'),
-            'bamboo': import_folder('../graphics/particles/bamboo'),
+            'squid': asset_manager.frames('../graphics/particles/smoke_orange'),
+            'raccoon': asset_manager.frames('../graphics/particles/raccoon'),
+            'spirit': asset_manager.frames('../graphics/particles/nova'),
+            'bamboo': asset_manager.frames('../graphics/particles/bamboo'),
 
             # leafs
             'leaf': (
-                import_folder('../graphics/particles/leaf1'),
-                import_folder('../graphics/particles/leaf2'),
-                import_folder('../graphics/particles/leaf3'),
-                import_folder('../graphics/particles/leaf4'),
-                import_folder('../graphics/particles/leaf5'),
-                import_folder('../graphics/particles/leaf6'),
-                self.reflect_images(import_folder('../graphics/particles/leaf1')),
-                self.reflect_images(import_folder('../graphics/particles/leaf2')),
-                self.reflect_images(import_folder('../graphics/particles/leaf3')),
-                self.reflect_images(import_folder('../graphics/particles/leaf4')),
-                self.reflect_images(import_folder('../graphics/particles/leaf5')),
-                self.reflect_images(import_folder('../graphics/particles/leaf6'))
+                asset_manager.frames('../graphics/particles/leaf1'),
+                asset_manager.frames('../graphics/particles/leaf2'),
+                asset_manager.frames('../graphics/particles/leaf3'),
+                asset_manager.frames('../graphics/particles/leaf4'),
+                asset_manager.frames('../graphics/particles/leaf5'),
+                asset_manager.frames('../graphics/particles/leaf6'),
+                self.reflect_images(asset_manager.frames('../graphics/particles/leaf1')),
+                self.reflect_images(asset_manager.frames('../graphics/particles/leaf2')),
+                self.reflect_images(asset_manager.frames('../graphics/particles/leaf3')),
+                self.reflect_images(asset_manager.frames('../graphics/particles/leaf4')),
+                self.reflect_images(asset_manager.frames('../graphics/particles/leaf5')),
+                self.reflect_images(asset_manager.frames('../graphics/particles/leaf6'))
             )
         }
 
@@ -49,31 +51,97 @@ class AnimationPlayer:
             new_frames.append(flipped_frame)
         return new_frames
 
-    def create_grass_particles(self, pos, groups):
+    def create_grass_particles(self, pos):
         animation_frames = choice(self.frames['leaf'])
-        ParticleEffect(pos, animation_frames, groups)
+        self.pool.spawn(animation_frames, pos)
 
-    def create_particles(self, animation_type, pos, groups):
+    def create_particles(self, animation_type, pos, attack=False):
         animation_frames = self.frames[animation_type]
-        ParticleEffect(pos, animation_frames, groups)
+        self.pool.spawn(animation_frames, pos, attack)
 
-class ParticleEffect(pygame.sprite.Sprite):
-    def __init__(self, pos, animation_frames, groups):
-        super().__init__(groups)
-        self.sprite_type = 'skill'
-        self.frame_index = 0
+    def update(self, dt=1.0):
+        self.pool.update(dt)
+
+    def draw(self, surface, camera_rect):
+        return self.pool.draw(surface, camera_rect)
+
+    def attack_rects(self):
+        return self.pool.attack_rects()
+
+
+class ParticlePool:
+    def __init__(self, cap):
+        # Parallel slots used as a ring, new particles take the slot after the newest one
+        self.cap = cap
+        self.frames = [None] * cap
+        self.frame_index = [0.0] * cap
+        self.x = [0] * cap
+        self.y = [0] * cap
+        self.width = [0] * cap
+        self.height = [0] * cap
+        self.attack = [False] * cap
+        self.alive = [False] * cap
         self.animation_speed = 0.15
-        self.frames = animation_frames
-        self.image = self.frames[self.frame_index]
-        self.rect = self.image.get_rect(center=pos)
 
-    def animate(self):
-        self.frame_index += self.animation_speed
-        if self.frame_index >= len(self.frames):
-            self.kill()
-        else:
-            self.image = self.frames[int(self.frame_index)]
+        # Slots from start up to start + span (wrapping) can hold live particles, start is the oldest
+        self.start = 0
+        self.span = 0
+        self.count = 0
+
+    def spawn(self, animation_frames, pos, attack=False):
+        if self.span == self.cap:
+            # Full, the oldest particle gives up its slot
+            if self.alive[self.start]:
+                self.count -= 1
+            self.start = (self.start + 1) % self.cap
+            self.span -= 1
+
+        index = (self.start + self.span) % self.cap
+        self.span += 1
+        self.count += 1
+
+        # Positioned by the first frame like a sprite rect, later frames are drawn at the same corner
+        width, height = animation_frames[0].get_size()
+        self.frames[index] = animation_frames
+        self.frame_index[index] = 0.0
+        self.x[index] = int(pos[0]) - width // 2
+        self.y[index] = int(pos[1]) - height // 2
+        self.width[index] = width
+        self.height[index] = height
+        self.attack[index] = attack
+        self.alive[index] = True
+
+    def live_slots(self):
+        for offset in range(self.span):
+            index = (self.start + offset) % self.cap
+            if self.alive[index]:
+                yield index
+
+    def update(self, dt=1.0):
+        frames, frame_index, alive = self.frames, self.frame_index, self.alive
+        step = self.animation_speed * dt
+        for index in self.live_slots():
+            frame_index[index] += step
+            if frame_index[index] >= len(frames[index]):
+                alive[index] = False
+                frames[index] = None
+                self.count -= 1
+
+        # Finished particles at the old end are handed back to the ring
+        while self.span and not alive[self.start]:
+            self.start = (self.start + 1) % self.cap
+            self.span -= 1
 
-    def update(self):
-        self.animate()
+    def draw(self, surface, camera_rect):
+        left, top, right, bottom = camera_rect.left, camera_rect.top, camera_rect.right, camera_rect.bottom
+        blits = []
+        for index in self.live_slots():
+            x, y = self.x[index], self.y[index]
+            if x < right and y < bottom and x + self.width[index] > left and y + self.height[index] > top:
+                blits.append((self.frames[index][int(self.frame_index[index])], (x - left, y - top)))
+        return surface.blits(blits)
 
+    def attack_rects(self):
+        return [
+            pygame.Rect(self.x[index], self.y[index], self.width[index], self.height[index])
+            for index in self.live_slots() if self.attack[index]]
@@ -1,13 +1,17 @@
 import pygame
 from settings import *
-from support import import_folder
+from runtime import runtime
+from assets import asset_manager
+from effects import effects
+from sfx import sfx
 from entity import Entity
 
 
 class Player(Entity):
     def __init__(self, pos, groups, obstacle_sprites, create_weapon, destroy_weapon, create_skill):
         super().__init__(groups)
-        self.image = pygame.image.load('../graphics/test/player.png').convert_alpha()
+        self.sprite_type = 'player'
+        self.image = asset_manager.image('../graphics/test/player.png')
         self.rect = self.image.get_rect(topleft=pos)
         self.hitbox = self.rect.inflate(-6, HITBOX_OFFSET['player'])
 
@@ -53,8 +57,7 @@ class Player(Entity):
         self.invincibility_Duration = 500
 
         # Import a sound
-        self.weapon_attack_sound = pygame.mixer.Sound('../audio/sword.wav')
-        self.weapon_attack_sound.set_volume(0.4)
+        self.weapon_attack_sound = sfx.effect('../audio/sword.wav', 0.4, 'player', limit=2)
 
     def import_player_assets(self):
         character_path = '../graphics/player/'
@@ -66,11 +69,11 @@ class Player(Entity):
 
         for animation in self.animations.keys():
             animation_path = character_path + animation
-            self.animations[animation] = import_folder(animation_path)
+            self.animations[animation] = asset_manager.frames(animation_path)
 
     def input(self):
         if not self.isAttacking:
-            keys = pygame.key.get_pressed()
+            keys = runtime.get_pressed()
             # Move input
             if keys[pygame.K_UP]:
                 self.direction.y = -1
@@ -93,14 +96,14 @@ class Player(Entity):
             # Attack input
             if keys[pygame.K_SPACE]:
                 self.isAttacking = True
-                self.attack_time = pygame.time.get_ticks()
+                self.attack_time = runtime.get_ticks()
                 self.create_weapon()
                 self.weapon_attack_sound.play()
 
             # Skill input
             if keys[pygame.K_LCTRL]:
                 self.isAttacking = True
-                self.attack_time = pygame.time.get_ticks()
+                self.attack_time = runtime.get_ticks()
                 style = list(skill_data.keys())[self.skill_index]
                 strength = list(skill_data.values())[self.skill_index]['strength'] + self.stats['skill']
                 cost = list(skill_data.values())[self.skill_index]['cost']
@@ -108,7 +111,7 @@ class Player(Entity):
 
             if keys[pygame.K_q] and not self.isSwitchingWeapon:
                 self.isSwitchingWeapon = True
-                self.weapon_switch_time = pygame.time.get_ticks()
+                self.weapon_switch_time = runtime.get_ticks()
 
                 if self.weapon_index >= len(list(weapon_data.keys())) - 1:
                     self.weapon_index = 0
@@ -119,7 +122,7 @@ class Player(Entity):
 
             if keys[pygame.K_e] and not self.isSwitchingSkill:
                 self.isSwitchingSkill = True
-                self.skill_switch_time = pygame.time.get_ticks()
+                self.skill_switch_time = runtime.get_ticks()
 
                 if self.skill_index >= len(list(skill_data.keys())) - 1:
                     self.skill_index = 0
@@ -145,7 +148,7 @@ class Player(Entity):
                     self.status = self.status + '_attack'
 
     def cooldowns(self):
-        current_time = pygame.time.get_ticks()
+        current_time = runtime.get_ticks()
         if self.isAttacking:
             if current_time - self.attack_time >= self.attacking_CD + weapon_data[self.weapon]['cooldown']:
                 self.isAttacking = False
@@ -164,11 +167,11 @@ class Player(Entity):
             if current_time - self.hit_time >= self.invincibility_Duration:
                 self.isInvincible = False
 
-    def animate(self):
+    def animate(self, dt=1.0):
         animation = self.animations[self.status]
 
         # Loop over frame_index
-        self.frame_index += self.animation_speed
+        self.frame_index += self.animation_speed * dt
         if self.frame_index >= len(animation):
             self.frame_index = 0
 
@@ -178,10 +181,8 @@ class Player(Entity):
 
         # Flicker
         if self.isInvincible:
-            alpha = self.wave_value()
-            self.image.set_alpha(alpha)
-        else:
-            self.image.set_alpha(255)
+            # Frames are shared through the asset cache, the faded ones come from the effects cache
+            self.image = effects.faded(self.image, self.wave_value())
 
     def get_full_weapon_damage(self):
         base_damage = self.stats['attack']
@@ -199,16 +200,17 @@ class Player(Entity):
     def get_cost_by_index(self, index):
         return list(self.upgrade_cost.values())[index]
 
-    def energy_recover(self):
+    def energy_recover(self, dt=1.0):
         if self.energy < self.stats['energy']:
-            self.energy += 0.01 * self.stats['skill']
+            self.energy += 0.01 * self.stats['skill'] * dt
         else:
             self.energy = self.stats['energy']
 
-    def update(self):
+    def update(self, dt=1.0):
+        # dt is the step length in frames of BASE_FPS
         self.input()
         self.cooldowns()
         self.get_status()
-        self.animate()
-        self.move(self.stats['speed'])
-        self.energy_recover()
+        self.animate(dt)
+        self.move(self.stats['speed'] * dt)
+        self.energy_recover(dt)
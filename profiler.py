@@ -0,0 +1,146 @@
+import os
+import json
+from collections import deque
+from time import perf_counter
+import pygame
+from settings import *
+from assets import asset_manager
+
+
+class Scope:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        if self.profiler.enabled:
+            self.start = perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.profiler.enabled:
+            self.profiler.add_time(self.name, perf_counter() - self.start)
+
+
+class Profiler:
+    def __init__(self, history=PROFILER_HISTORY):
+        # Everything below is skipped by a single check while disabled
+        self.enabled = False
+        self.overlay = False
+        self.scopes = {}
+        self.times = {}
+        self.counters = {}
+        self.history = deque(maxlen=history)
+        self.frame = 0
+        self.frame_start = None
+
+        # Rolling dump, one JSON object per frame
+        self.dump_path = None
+        self.dump_file = None
+        self.dump_lines = 0
+
+        self.font = None
+
+    def scope(self, name):
+        # Scopes are reused so timing a block allocates nothing
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = Scope(self, name)
+        return scope
+
+    def add_time(self, name, seconds):
+        self.times[name] = self.times.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def refresh(self):
+        self.enabled = self.overlay or self.dump_file is not None
+        self.frame_start = None
+
+    def start_frame(self):
+        # Called before the frame's work, so waiting on the clock is left out of frame_ms
+        if self.enabled:
+            self.frame_start = perf_counter()
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.refresh()
+
+    def start_dump(self, path=PROFILER_DUMP):
+        self.dump_path = path
+        self.dump_file = open(path, 'w')
+        self.dump_lines = 0
+        self.refresh()
+
+    def stop_dump(self):
+        if self.dump_file:
+            self.dump_file.close()
+        self.dump_file = None
+        self.refresh()
+
+    def toggle_dump(self):
+        if self.dump_file:
+            self.stop_dump()
+        else:
+            self.start_dump()
+
+    def roll_dump(self):
+        # The finished file is kept as a single backup next to the new one
+        self.dump_file.close()
+        os.replace(self.dump_path, self.dump_path + '.1')
+        self.dump_file = open(self.dump_path, 'w')
+        self.dump_lines = 0
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        frame_time = perf_counter() - self.frame_start if self.frame_start else 0.0
+        record = {'frame': self.frame, 'frame_ms': round(frame_time * 1000, 3)}
+        for name, seconds in self.times.items():
+            record[name + '_ms'] = round(seconds * 1000, 3)
+        record.update(self.counters)
+        self.history.append(record)
+
+        if self.dump_file:
+            self.dump_file.write(json.dumps(record) + '\n')
+            self.dump_lines += 1
+            if self.dump_lines >= PROFILER_DUMP_FRAMES:
+                self.roll_dump()
+
+        self.times = {}
+        self.counters = {}
+        self.frame += 1
+
+    def draw(self, surface):
+        if not self.overlay or not self.history:
+            return
+        if self.font is None:
+            self.font = asset_manager.font(UI_FONT, PROFILER_FONT_SIZE)
+
+        # Frame time graph, the line marks the frame budget
+        graph_height = 100
+        budget = 1000 / FPS
+        panel = pygame.Rect(surface.get_width() - self.history.maxlen - 20, 10, self.history.maxlen + 10, graph_height + 10)
+        pygame.draw.rect(surface, UI_BG_COLOR, panel)
+        for index, record in enumerate(self.history):
+            height = min(graph_height, int(record['frame_ms'] / (budget * 2) * graph_height))
+            color = HEALTH_COLOR if record['frame_ms'] > budget else ENERGY_COLOR
+            x = panel.left + 5 + index
+            pygame.draw.line(surface, color, (x, panel.bottom - 5), (x, panel.bottom - 5 - height))
+        budget_y = panel.bottom - 5 - graph_height // 2
+        pygame.draw.line(surface, TEXT_COLOR, (panel.left, budget_y), (panel.right - 1, budget_y))
+
+        # Latest values below the graph
+        y = panel.bottom + 5
+        for name, value in self.history[-1].items():
+            text = f'{name} {value:.2f}' if isinstance(value, float) else f'{name} {value}'
+            text_surf = self.font.render(text, False, TEXT_COLOR)
+            text_rect = text_surf.get_rect(topright=(panel.right, y))
+            pygame.draw.rect(surface, UI_BG_COLOR, text_rect.inflate(6, 2))
+            surface.blit(text_surf, text_rect)
+            y += text_rect.height + 2
+
+
+profiler = Profiler()
@@ -0,0 +1,41 @@
+import pygame
+
+
+class KeyState:
+    # Stands in for pygame.key.get_pressed(), indexed by the same key constants
+    def __init__(self, pressed=()):
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+
+class Runtime:
+    def __init__(self):
+        # None means real time and the real keyboard, the headless runner fills them in
+        self.ticks = None
+        self.keys = None
+
+    def get_ticks(self):
+        if self.ticks is None:
+            return pygame.time.get_ticks()
+        return int(self.ticks)
+
+    def get_pressed(self):
+        if self.keys is None:
+            return pygame.key.get_pressed()
+        return self.keys
+
+    def simulate(self, start=0):
+        self.ticks = start
+        self.keys = KeyState()
+
+    def advance(self, milliseconds):
+        self.ticks += milliseconds
+
+    def reset(self):
+        self.ticks = None
+        self.keys = None
+
+
+runtime = Runtime()
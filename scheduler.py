@@ -0,0 +1,95 @@
+import pygame
+from settings import *
+from crowd import Crowd
+from profiler import profiler
+
+try:
+    from batch import EnemyBatch, STATUSES, TIERS
+except ImportError:
+    # NumPy is optional, without it every enemy works out its own distance to the player
+    EnemyBatch = None
+
+
+class EnemyScheduler:
+    def __init__(self):
+        # Squared distances to the player below which each kind of enemy is awake or drowsy
+        self.thresholds = {}
+        for monster_name, monster_info in monster_data.items():
+            awake_radius = monster_info['notice_radius'] + AI_WAKE_MARGIN
+            drowsy_radius = monster_info['notice_radius'] * AI_SLEEP_FACTOR
+            self.thresholds[monster_name] = (awake_radius ** 2, drowsy_radius ** 2)
+
+        self.batch = EnemyBatch(self.thresholds) if EnemyBatch else None
+        self.crowd = Crowd()
+        self.frame = 0
+        self.joined = 0
+
+    def add(self, enemy):
+        # Drowsy enemies take turns by the order they joined, so each frame ticks about the same number of them
+        enemy.tick_offset = self.joined
+        self.joined += 1
+
+    def drowsy_turn(self, enemy, frame):
+        return (frame + enemy.tick_offset) % AI_DROWSY_INTERVAL == 0
+
+    def get_tier(self, enemy, player):
+        enemy_x, enemy_y = enemy.rect.center
+        player_x, player_y = player.rect.center
+        distance_sq = (enemy_x - player_x) ** 2 + (enemy_y - player_y) ** 2
+        awake_sq, drowsy_sq = self.thresholds[enemy.monster_name]
+
+        if distance_sq <= awake_sq:
+            return 'awake'
+        elif distance_sq <= drowsy_sq:
+            return 'drowsy'
+        else:
+            return 'asleep'
+
+    def tick(self, enemy, tier, dt):
+        # Moves the enemy and tells whether it should think this frame
+        if tier == 'awake':
+            enemy.update(dt)
+            return True
+        elif tier == 'drowsy':
+            # Out of notice range, ticked every few frames (staggered) with the skipped frames caught up
+            if self.drowsy_turn(enemy, self.frame):
+                enemy.update(AI_DROWSY_INTERVAL * dt)
+                return True
+        return False
+
+    def update(self, enemies, player, dt=1.0):
+        self.frame += 1
+        # Enemies per tier for the profiler, only counted while it is on
+        counts = {'awake': 0, 'drowsy': 0, 'asleep': 0} if profiler.enabled else None
+        thinking = []
+
+        if self.batch and len(enemies) >= AI_BATCH_MIN:
+            ticked = []
+            for index, tier in enumerate(self.batch.tiers(enemies, player.rect.center).tolist()):
+                if counts:
+                    counts[TIERS[tier]] += 1
+                if self.tick(enemies[index], TIERS[tier], dt):
+                    ticked.append(index)
+
+            # Decided after moving, from the positions the enemies ended up at
+            if ticked:
+                ticked_enemies, statuses, directions = self.batch.decide(ticked, player.rect.center)
+                for enemy, status, direction in zip(ticked_enemies, statuses.tolist(), directions.tolist()):
+                    enemy.enemy_update(player, STATUSES[status], pygame.math.Vector2(direction))
+                thinking = ticked_enemies
+        else:
+            for enemy in enemies:
+                tier = self.get_tier(enemy, player)
+                if counts:
+                    counts[tier] += 1
+                if self.tick(enemy, tier, dt):
+                    enemy.enemy_update(player)
+                    thinking.append(enemy)
+
+        # Enemies chasing together spread out instead of piling onto the same pixels
+        if self.crowd and thinking:
+            self.crowd.steer([enemy for enemy in thinking if enemy.alive()], player)
+
+        if counts:
+            for tier, count in counts.items():
+                profiler.count('ai_' + tier, count)
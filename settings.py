@@ -1,8 +1,19 @@
 # Game Setup
 WIDTH = 1280
 HEIGHT = 720
-FPS = 60
+FPS = 60  # Frames drawn per second at most
+SIM_FPS = 60  # Simulation steps per second, independent of FPS
+BASE_FPS = 60  # Speeds, animation and regeneration rates are given per frame at this rate
+MAX_FRAME_TIME = 250  # Milliseconds of a slow frame simulated at most, longer stalls are dropped
+INTERPOLATE = False  # Draw moving sprites between their last two simulated positions
 TILESIZE = 64
+CHUNK_SIZE = 8  # Tiles per side of a baked floor chunk
+STREAMING = False  # Only keep the chunks around the player loaded, for maps too big to build at once
+STREAM_RADIUS = 2  # Chunks kept loaded on each side of the player's chunk
+PARTICLE_CAP = 256  # Particles alive at once, the oldest make way past this
+FLICKER_INTERVAL = 50  # Milliseconds between hidden and shown while invincible
+DIRTY_RECTS = True  # Only push the changed parts of the screen to the window, the menu draws over a still of the world
+COLLISION_STEP = 16  # Longest move swept in one go, longer ones are split
 HITBOX_OFFSET = {
     'player': -26,
     'object': -40,
@@ -10,6 +21,27 @@ HITBOX_OFFSET = {
     'invisible': 0
 }
 
+# Enemy AI scheduling
+AI_WAKE_MARGIN = 128  # Distance past notice_radius within which enemies think every frame
+AI_SLEEP_FACTOR = 3  # Enemies further than notice_radius times this are asleep
+AI_DROWSY_INTERVAL = 4  # Frames between updates of the enemies in between
+AI_BATCH_MIN = 50  # Below this many enemies the per enemy math beats the NumPy batch
+CROWD_RADIUS = 48  # Enemies closer than this push each other apart
+CROWD_MAX_NEIGHBOURS = 6  # Most neighbours an enemy steers away from
+CROWD_SEPARATION = 1.0  # Weight of that push against the way to the player
+FLOW_RADIUS = 16  # Steps from the player's tile the shared flow field reaches, further away enemies head straight for it
+
+# Sound effects
+SFX_CHANNELS = {'ambience': 1, 'ui': 1, 'player': 4, 'enemy': 10}  # Mixer channels reserved for each kind of sound
+SFX_LIMIT = 3  # Copies of the same sound playing at once, unless it asks for another limit
+SFX_DISTANCE = 800  # Sounds this far from the player are not played, closer ones fade and pan with distance
+
+# Profiling
+PROFILER_HISTORY = 240  # Frames shown in the overlay graph (F3)
+PROFILER_DUMP = 'profile.jsonl'  # Per frame records written while dumping (F4)
+PROFILER_DUMP_FRAMES = 3600  # Frames per dump file before it rolls over to a .1 backup
+PROFILER_FONT_SIZE = 12
+
 # UI
 BAR_HEIGHT = 20
 HEALTH_BAR_WIDTH = 200
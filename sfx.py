@@ -0,0 +1,107 @@
+from math import hypot
+import pygame
+from settings import *
+from assets import asset_manager
+from profiler import profiler
+
+
+class SoundEffect:
+    def __init__(self, manager, sound, category, priority, limit):
+        # One per sound and settings, shared by everything that plays it
+        self.manager = manager
+        self.sound = sound
+        self.category = category
+        self.priority = priority
+        self.limit = limit
+
+    def play(self, pos=None, loops=0):
+        return self.manager.play(self, pos, loops)
+
+
+class SoundEffects:
+    def __init__(self, pools=SFX_CHANNELS, distance=SFX_DISTANCE):
+        self.pools = pools
+        self.distance = distance
+        self.effects = {}
+
+        # Channels by category, set up once the mixer is running, and what each one was last given to play
+        self.channels = None
+        self.voices = {}
+        self.listener = None
+        self.counts = dict.fromkeys(('played', 'stolen', 'limited', 'culled', 'dropped'), 0)
+
+    def effect(self, path, volume=None, category='enemy', priority=1, limit=SFX_LIMIT):
+        # Decoded once by the asset manager, the handle is shared by every caller with the same settings
+        key = (path, volume, category, priority, limit)
+        if key not in self.effects:
+            self.effects[key] = SoundEffect(self, asset_manager.sound(path, volume), category, priority, limit)
+        return self.effects[key]
+
+    def setup(self):
+        # Every channel belongs to one pool and is reserved, so sounds played past the manager can't take them
+        total = sum(self.pools.values())
+        pygame.mixer.set_num_channels(total)
+        pygame.mixer.set_reserved(total)
+        self.channels = {}
+        first = 0
+        for category, count in self.pools.items():
+            self.channels[category] = [pygame.mixer.Channel(index) for index in range(first, first + count)]
+            first += count
+
+    def listen(self, pos):
+        self.listener = pos
+
+    def stereo(self, pos):
+        # Left and right volume of a sound at pos, quieter and panned with its distance, None when out of earshot
+        if pos is None or self.listener is None:
+            return 1.0, 1.0
+        dx = pos[0] - self.listener[0]
+        dy = pos[1] - self.listener[1]
+        distance = hypot(dx, dy)
+        if distance >= self.distance:
+            return None
+        volume = 1 - distance / self.distance
+        pan = dx / self.distance
+        return volume * min(1.0, 1 - pan), volume * min(1.0, 1 + pan)
+
+    def note(self, outcome):
+        self.counts[outcome] += 1
+        profiler.count('sfx_' + outcome)
+
+    def play(self, effect, pos=None, loops=0):
+        # Returns the channel the sound went to, None when it was not played
+        if not pygame.mixer.get_init():
+            return None
+        if self.channels is None:
+            self.setup()
+
+        stereo = self.stereo(pos)
+        if stereo is None:
+            self.note('culled')
+            return None
+
+        pool = self.channels[effect.category]
+        busy = [channel for channel in pool if channel.get_busy()]
+        if sum(1 for channel in busy if self.voices.get(channel) is effect) >= effect.limit:
+            self.note('limited')
+            return None
+
+        if len(busy) < len(pool):
+            channel = next(channel for channel in pool if not channel.get_busy())
+        else:
+            # A full pool only makes way for a more important sound, by cutting the least important one
+            channel = min(pool, key=lambda channel: self.voices[channel].priority)
+            if self.voices[channel].priority >= effect.priority:
+                self.note('dropped')
+                return None
+            channel.stop()
+            self.note('stolen')
+
+        channel.play(effect.sound, loops)
+        channel.set_volume(*stereo)
+        self.voices[channel] = effect
+        self.note('played')
+        return channel
+
+
+sfx = SoundEffects()
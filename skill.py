@@ -1,27 +1,28 @@
 import pygame
 from settings import *
 from random import randint
+from sfx import sfx
 
 
 class SkillPlayer():
     def __init__(self, animation_player):
         self.animation_player = animation_player
         self.sounds = {
-            'heal': pygame.mixer.Sound('../audio/heal.wav'),
-            'flame': pygame.mixer.Sound('../audio/fire.wav')
+            'heal': sfx.effect('../audio/heal.wav', category='player', priority=2),
+            'flame': sfx.effect('../audio/Fire.wav', category='player', priority=2)
         }
 
-    def heal(self, player, strength, cost, sprite_groups):
+    def heal(self, player, strength, cost):
         if player.energy >= cost:
             self.sounds['heal'].play()
             player.health += strength
             player.energy -= cost
             if player.health > player.stats['health']:
                 player.health = player.stats['health']
-            self.animation_player.create_particles('aura', player.rect.center, sprite_groups)
-            self.animation_player.create_particles('heal', player.rect.center + pygame.math.Vector2(0, -60), sprite_groups)
+            self.animation_player.create_particles('aura', player.rect.center)
+            self.animation_player.create_particles('heal', player.rect.center + pygame.math.Vector2(0, -60))
 
-    def flame(self, player, cost, sprite_groups):
+    def flame(self, player, cost):
         if player.energy >= cost:
             player.energy -= cost
             self.sounds['flame'].play()
@@ -37,9 +38,9 @@ class SkillPlayer():
                     offset_x = (direction.x * i) * TILESIZE
                     x = player.rect.centerx + offset_x + randint(-TILESIZE // 3, TILESIZE // 3)
                     y = player.rect.centery + randint(-TILESIZE // 3, TILESIZE // 3)
-                    self.animation_player.create_particles('flame', (x, y), sprite_groups)
+                    self.animation_player.create_particles('flame', (x, y), attack=True)
                 else:  # Vertical
                     offset_y = (direction.y * i) * TILESIZE
                     x = player.rect.centerx + randint(-TILESIZE // 3, TILESIZE // 3)
                     y = player.rect.centery + offset_y + randint(-TILESIZE // 3, TILESIZE // 3)
-                    self.animation_player.create_particles('flame', (x, y), sprite_groups)
\ No newline at end of file
+                    self.animation_player.create_particles('flame', (x, y), attack=True)
\ No newline at end of file
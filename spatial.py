@@ -0,0 +1,54 @@
+from settings import *
+
+
+class SpatialHash:
+    def __init__(self, cell_size=TILESIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.sprite_cells = {}
+
+    def cell_range(self, rect):
+        left = rect.left // self.cell_size
+        top = rect.top // self.cell_size
+        right = max(rect.right - 1, rect.left) // self.cell_size
+        bottom = max(rect.bottom - 1, rect.top) // self.cell_size
+        return left, top, right, bottom
+
+    def insert(self, sprite, rect):
+        if sprite in self.sprite_cells:
+            self.remove(sprite)
+
+        left, top, right, bottom = self.cell_range(rect)
+        keys = []
+        for row in range(top, bottom + 1):
+            for col in range(left, right + 1):
+                key = (col, row)
+                self.cells.setdefault(key, []).append(sprite)
+                keys.append(key)
+        self.sprite_cells[sprite] = keys
+
+    def remove(self, sprite):
+        for key in self.sprite_cells.pop(sprite, ()):
+            cell = self.cells[key]
+            cell.remove(sprite)
+            if not cell:
+                del self.cells[key]
+
+    def query(self, rect):
+        # Sprites spanning several cells are only returned once
+        left, top, right, bottom = self.cell_range(rect)
+        found = {}
+        for row in range(top, bottom + 1):
+            for col in range(left, right + 1):
+                cell = self.cells.get((col, row))
+                if cell:
+                    for sprite in cell:
+                        found[sprite] = None
+        return list(found)
+
+    def clear(self):
+        self.cells.clear()
+        self.sprite_cells.clear()
+
+    def __len__(self):
+        return len(self.sprite_cells)
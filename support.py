@@ -1,6 +1,6 @@
 from csv import reader
-from os import walk
 import pygame
+from manifest import frame_manifest
 
 
 def import_csv_layout(path):
@@ -12,11 +12,14 @@ def import_csv_layout(path):
         return terrain_map
 
 
+def folder_files(path):
+    # Frames in numeric order, read from the manifest instead of walking the folder
+    return frame_manifest.files(path)
+
+
 def import_folder(path):
     surface_list = []
-    for _, __, img_files in walk(path):
-        for img in img_files:
-            full_path = path + '/' + img
-            image_surf = pygame.image.load(full_path).convert_alpha()
-            surface_list.append(image_surf)
+    for full_path in folder_files(path):
+        image_surf = pygame.image.load(full_path).convert_alpha()
+        surface_list.append(image_surf)
     return surface_list
@@ -4,7 +4,7 @@ from settings import *
 
 class Tile(pygame.sprite.Sprite):
     def __init__(self, pos, groups, sprite_type, surface=pygame.Surface((TILESIZE, TILESIZE))):
-        super().__init__(groups)
+        super().__init__()
         self.sprite_type = sprite_type
         y_offset = HITBOX_OFFSET[sprite_type]
         self.image = surface
@@ -12,4 +12,7 @@ class Tile(pygame.sprite.Sprite):
             self.rect = self.image.get_rect(topleft=(pos[0], pos[1] - TILESIZE))
         else:
             self.rect = self.image.get_rect(topleft=pos)
-        self.hitbox = self.rect.inflate(0, y_offset)
\ No newline at end of file
+        self.hitbox = self.rect.inflate(0, y_offset)
+
+        # Join the groups once the hitbox exists, obstacle groups index it on add
+        self.add(groups)
\ No newline at end of file
@@ -0,0 +1,49 @@
+from array import array
+import pygame
+from settings import *
+
+# Solidity bits kept per cell
+SOLID = 1  # Blocks movement
+
+
+class Block:
+    # Stands in for an obstacle sprite in queries, collision only ever looks at the hitbox
+    __slots__ = ('hitbox',)
+
+    def __init__(self, hitbox):
+        self.hitbox = hitbox
+
+
+class TileMap:
+    def __init__(self, rows, cols, hitbox_offset=HITBOX_OFFSET['invisible']):
+        # A tile id and a solidity bitmask per cell, row-major, instead of a sprite per tile
+        self.rows = rows
+        self.cols = cols
+        self.hitbox_offset = hitbox_offset
+        self.ids = array('h', [-1]) * (rows * cols)
+        self.flags = bytearray(rows * cols)
+        self.blocks = {}
+
+    @classmethod
+    def from_layer(cls, layer, flags=SOLID):
+        tilemap = cls(layer.rows, layer.cols)
+        tilemap.add_layer(layer, flags)
+        return tilemap
+
+    def add_layer(self, layer, flags=SOLID):
+        for row_index, col_index, tile_id in layer.tiles():
+            index = row_index * self.cols + col_index
+            self.ids[index] = tile_id
+            self.flags[index] |= flags
+
+    def block_at(self, index):
+        # Blocks are made the first time something runs into their cell
+        block = self.blocks.get(index)
+        if block is None:
+            block = self.blocks[index] = self.block(index)
+        return block
+
+    def block(self, index):
+        row, col = divmod(index, self.cols)
+        hitbox = pygame.Rect(col * TILESIZE, row * TILESIZE, TILESIZE, TILESIZE)
+        return Block(hitbox.inflate(0, self.hitbox_offset))
@@ -1,34 +1,76 @@
 import pygame
 from settings import *
+from assets import asset_manager
+
+
+class TextCache:
+    def __init__(self, font, limit=256):
+        # Rendered strings keyed by (text, color), dropped all at once when it grows past the limit
+        self.font = font
+        self.limit = limit
+        self.surfaces = {}
+
+    def render(self, text, color):
+        key = (text, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if len(self.surfaces) >= self.limit:
+                self.surfaces.clear()
+            surface = self.surfaces[key] = self.font.render(text, False, color)
+        return surface
+
+
+class Panel:
+    def __init__(self, rect):
+        # A part of the HUD, redrawn only when the values behind it change
+        self.rect = rect
+        self.surface = pygame.Surface(rect.size, pygame.SRCALPHA)
+        self.state = None
+
+    def refresh(self, state, draw):
+        if state == self.state:
+            return False
+        self.state = state
+        self.surface.fill((0, 0, 0, 0))
+        draw(self.surface)
+        return True
 
 
 class UI:
     def __init__(self):
         # General
         self.display_surface = pygame.display.get_surface()
-        self.font = pygame.font.Font(UI_FONT, UI_FONT_SIZE)
+        self.font = asset_manager.font(UI_FONT, UI_FONT_SIZE)
+        self.text = TextCache(self.font)
 
-        # Bar setup
-        self.health_bar_rect = pygame.Rect(10, 10, HEALTH_BAR_WIDTH, BAR_HEIGHT)
-        self.energy_bar_rect = pygame.Rect(10, 34, ENERGY_BAR_WIDTH, BAR_HEIGHT)
+        # Bar setup, relative to the bar panel
+        self.health_bar_rect = pygame.Rect(0, 0, HEALTH_BAR_WIDTH, BAR_HEIGHT)
+        self.energy_bar_rect = pygame.Rect(0, 24, ENERGY_BAR_WIDTH, BAR_HEIGHT)
+
+        # Panels
+        self.bar_panel = Panel(pygame.Rect(10, 10, max(HEALTH_BAR_WIDTH, ENERGY_BAR_WIDTH), 24 + BAR_HEIGHT))
+        self.item_panel = Panel(pygame.Rect(10, 630, 70 + ITEM_BOX_SIZE, 5 + ITEM_BOX_SIZE))
+        self.exp_surf = None
+        self.exp_rect = None
+        self.exp = None
 
         # Convert weapon dictionary
         self.weapon_graphics = []
         for weapon in weapon_data.values():
             path = weapon['graphic']
-            weapon = pygame.image.load(path).convert_alpha()
+            weapon = asset_manager.image(path)
             self.weapon_graphics.append(weapon)
 
         # Convert weapon dictionary
         self.skill_graphics = []
         for skill in skill_data.values():
             path = skill['graphic']
-            skill = pygame.image.load(path).convert_alpha()
+            skill = asset_manager.image(path)
             self.skill_graphics.append(skill)
 
-    def show_bar(self, current_amount, max_amount, bg_rect, color):
+    def show_bar(self, surface, current_amount, max_amount, bg_rect, color):
         # Draw BG
-        pygame.draw.rect(self.display_surface, UI_BG_COLOR, bg_rect)
+        pygame.draw.rect(surface, UI_BG_COLOR, bg_rect)
 
         # Converting stat to pixel
         ratio = current_amount / max_amount
@@ -37,44 +79,86 @@ class UI:
         current_rect.width = current_width
 
         # Drawing the bar
-        pygame.draw.rect(self.display_surface, color, current_rect)
-        pygame.draw.rect(self.display_surface, UI_BORDER_COLOR, bg_rect, 3)
+        pygame.draw.rect(surface, color, current_rect)
+        pygame.draw.rect(surface, UI_BORDER_COLOR, bg_rect, 3)
+
+    def show_bars(self, surface, player):
+        self.show_bar(surface, player.health, player.stats['health'], self.health_bar_rect, HEALTH_COLOR)
+        self.show_bar(surface, player.energy, player.stats['energy'], self.energy_bar_rect, ENERGY_COLOR)
 
     def show_exp(self, exp):
-        text_surf = self.font.render(str(int(exp)), False, TEXT_COLOR)
+        # The box is drawn once per value and kept until the exp changes
+        if exp == self.exp:
+            return False
+        self.exp = exp
+        text_surf = self.text.render(str(int(exp)), TEXT_COLOR)
+        box_rect = text_surf.get_rect().inflate(20, 20)
         x = self.display_surface.get_size()[0] - 20
         y = self.display_surface.get_size()[1] - 20
-        text_rect = text_surf.get_rect(bottomright=(x, y))
+        self.exp_rect = pygame.Rect((0, 0), box_rect.size)
+        self.exp_rect.bottomright = (x + 10, y + 10)
 
-        pygame.draw.rect(self.display_surface, UI_BG_COLOR, text_rect.inflate(20, 20))
-        pygame.draw.rect(self.display_surface, UI_BORDER_COLOR, text_rect.inflate(20, 20), 3)
-        self.display_surface.blit(text_surf, text_rect)
+        self.exp_surf = pygame.Surface(box_rect.size)
+        self.exp_surf.fill(UI_BG_COLOR)
+        pygame.draw.rect(self.exp_surf, UI_BORDER_COLOR, self.exp_surf.get_rect(), 3)
+        self.exp_surf.blit(text_surf, (10, 10))
+        return True
 
-    def selection_box(self, left, top, isSwitching):
+    def selection_box(self, surface, left, top, isSwitching):
         bg_rect = pygame.Rect(left, top, ITEM_BOX_SIZE, ITEM_BOX_SIZE)
-        pygame.draw.rect(self.display_surface, UI_BG_COLOR, bg_rect)
+        pygame.draw.rect(surface, UI_BG_COLOR, bg_rect)
         if isSwitching:
-            pygame.draw.rect(self.display_surface, UI_BORDER_COLOR_ACTIVE, bg_rect, 3)
+            pygame.draw.rect(surface, UI_BORDER_COLOR_ACTIVE, bg_rect, 3)
         else:
-            pygame.draw.rect(self.display_surface, UI_BORDER_COLOR, bg_rect, 3)
+            pygame.draw.rect(surface, UI_BORDER_COLOR, bg_rect, 3)
         return bg_rect
 
-    def weapon_overlay(self, weapon_index, isSwitching):
-        bg_rect = self.selection_box(10, 630, isSwitching)
+    def weapon_overlay(self, surface, weapon_index, isSwitching):
+        bg_rect = self.selection_box(surface, 0, 0, isSwitching)
         weapon_surf = self.weapon_graphics[weapon_index]
         weapon_rect = weapon_surf.get_rect(center=bg_rect.center)
-        self.display_surface.blit(weapon_surf, weapon_rect)
+        surface.blit(weapon_surf, weapon_rect)
 
-    def skill_overlay(self, skill_index, isSwitching):
-        bg_rect = self.selection_box(80, 635, isSwitching)
+    def skill_overlay(self, surface, skill_index, isSwitching):
+        bg_rect = self.selection_box(surface, 70, 5, isSwitching)
         skill_surf = self.skill_graphics[skill_index]
         skill_rect = skill_surf.get_rect(center=bg_rect.center)
-        self.display_surface.blit(skill_surf, skill_rect)
+        surface.blit(skill_surf, skill_rect)
+
+    def show_items(self, surface, player):
+        self.weapon_overlay(surface, player.weapon_index, player.isSwitchingWeapon)
+        self.skill_overlay(surface, player.skill_index, player.isSwitchingSkill)
+
+    def display(self, player, background=None):
+        # Returns the screen rects that changed, given the background behind the HUD only those are drawn
+
+        # Keyed by the bar widths in pixels, energy regenerating by fractions does not redraw every frame
+        bar_state = (
+            int(self.health_bar_rect.width * player.health / player.stats['health']),
+            int(self.energy_bar_rect.width * player.energy / player.stats['energy']))
+        item_state = (player.weapon_index, player.isSwitchingWeapon, player.skill_index, player.isSwitchingSkill)
+
+        bars_changed = self.bar_panel.refresh(bar_state, lambda surface: self.show_bars(surface, player))
+        old_exp_rect = self.exp_rect
+        exp_changed = self.show_exp(player.exp)
+        items_changed = self.item_panel.refresh(item_state, lambda surface: self.show_items(surface, player))
 
-    def display(self, player):
-        self.show_bar(player.health, player.stats['health'], self.health_bar_rect, HEALTH_COLOR)
-        self.show_bar(player.energy, player.stats['energy'], self.energy_bar_rect, ENERGY_COLOR)
+        changed = []
+        if exp_changed and old_exp_rect:
+            changed.append(old_exp_rect)
+            if background is not None:
+                self.display_surface.blit(background, old_exp_rect, old_exp_rect)
 
-        self.show_exp(player.exp)
-        self.weapon_overlay(player.weapon_index, player.isSwitchingWeapon)
-        self.skill_overlay(player.skill_index, player.isSwitchingSkill)
+        parts = (
+            (self.bar_panel.surface, self.bar_panel.rect, bars_changed),
+            (self.exp_surf, self.exp_rect, exp_changed),
+            (self.item_panel.surface, self.item_panel.rect, items_changed))
+        for surface, rect, part_changed in parts:
+            if background is None:
+                self.display_surface.blit(surface, rect)
+            elif part_changed:
+                self.display_surface.blit(background, rect, rect)
+                self.display_surface.blit(surface, rect)
+            if part_changed:
+                changed.append(rect)
+        return changed
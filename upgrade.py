@@ -1,5 +1,8 @@
 import pygame
 from settings import *
+from runtime import runtime
+from assets import asset_manager
+from ui import TextCache
 
 
 class Upgrade:
@@ -10,7 +13,8 @@ class Upgrade:
         self.attribute_no = len(player.stats)
         self.attribute_names = list(player.stats.keys())
         self.max_values = list(player.max_stats.values())
-        self.font = pygame.font.Font(UI_FONT, UI_FONT_SIZE)
+        self.font = asset_manager.font(UI_FONT, UI_FONT_SIZE)
+        self.text = TextCache(self.font)
 
         # Item creation
         self.height = self.display_surface.get_size()[1] * 0.8
@@ -24,7 +28,7 @@ class Upgrade:
         self.moving_CD = 300
 
     def input(self):
-        keys = pygame.key.get_pressed()
+        keys = runtime.get_pressed()
 
         if not self.isMoving:
             if keys[pygame.K_RIGHT]:
@@ -32,21 +36,21 @@ class Upgrade:
                 if self.selection_index > self.attribute_no - 1:
                     self.selection_index = 0
                 self.isMoving = True
-                self.selection_time = pygame.time.get_ticks()
+                self.selection_time = runtime.get_ticks()
             elif keys[pygame.K_LEFT]:
                 self.selection_index -= 1
                 if self.selection_index < 0:
                     self.selection_index = self.attribute_no - 1
                 self.isMoving = True
-                self.selection_time = pygame.time.get_ticks()
+                self.selection_time = runtime.get_ticks()
             elif keys[pygame.K_SPACE]:
                 self.isMoving = True
-                self.selection_time = pygame.time.get_ticks()
+                self.selection_time = runtime.get_ticks()
                 self.item_list[self.selection_index].trigger(self.player)
 
     def selection_cooldown(self):
         if self.isMoving:
-            current_time = pygame.time.get_ticks()
+            current_time = runtime.get_ticks()
             if current_time - self.selection_time >= self.moving_CD:
                 self.isMoving = False
 
@@ -61,36 +65,45 @@ class Upgrade:
             # Vertical
             top = self.display_surface.get_size()[1] * 0.1
             # Create object
-            item = Item(left, top, self.width, self.height, index, self.font)
+            item = Item(left, top, self.width, self.height, index, self.text)
             self.item_list.append(item)
 
-    def display(self):
+    def display(self, force=True):
+        # Returns the rects of the items drawn, without force only the ones that changed are
         self.input()
         self.selection_cooldown()
+        changed = []
         for index, item in enumerate(self.item_list):
             # Get attributes
             name = self.attribute_names[index]
             value = self.player.get_value_by_index(index)
             max_value = self.max_values[index]
             cost = self.player.get_cost_by_index(index)
-            item.display(self.display_surface, self.selection_index, name, value, max_value, cost)
+            if item.display(self.display_surface, self.selection_index, name, value, max_value, cost, force):
+                changed.append(item.rect)
+        return changed
 
 
 class Item:
-    def __init__(self, left, top, width, height, index, font):
+    def __init__(self, left, top, width, height, index, text):
         self.rect = pygame.Rect(left, top, width, height)
         self.index = index
-        self.font = font
+        self.text = text
+
+        # Drawn in its own coordinates and kept until what it shows changes
+        self.local_rect = pygame.Rect((0, 0), self.rect.size)
+        self.surface = pygame.Surface(self.rect.size)
+        self.state = None
 
     def display_names(self, surface, name, cost, selected):
         color = TEXT_COLOR_SELECTED if selected else TEXT_COLOR
         # title
-        title_surf = self.font.render(name, False, color)
-        title_rect = title_surf.get_rect(midtop=self.rect.midtop + pygame.math.Vector2(0, 20))
+        title_surf = self.text.render(name, color)
+        title_rect = title_surf.get_rect(midtop=self.local_rect.midtop + pygame.math.Vector2(0, 20))
 
         # cost
-        cost_surf = self.font.render(str(int(cost)), False, color)
-        cost_rect = cost_surf.get_rect(midbottom=self.rect.midbottom + pygame.math.Vector2(0, -20))
+        cost_surf = self.text.render(str(int(cost)), color)
+        cost_rect = cost_surf.get_rect(midbottom=self.local_rect.midbottom + pygame.math.Vector2(0, -20))
 
         # draw
         surface.blit(title_surf, title_rect)
@@ -98,8 +111,8 @@ class Item:
 
     def display_bar(self, surface, value, max_value, selected):
         # Drawing setup
-        top = self.rect.midtop + pygame.math.Vector2(0, 60)
-        bottom = self.rect.midbottom + pygame.math.Vector2(0, -60)
+        top = self.local_rect.midtop + pygame.math.Vector2(0, 60)
+        bottom = self.local_rect.midbottom + pygame.math.Vector2(0, -60)
         color = BAR_COLOR_SELECTED if selected else BAR_COLOR
 
         # Bar setup
@@ -122,13 +135,21 @@ class Item:
         if player.stats[upgrade_attribute] >= player.max_stats[upgrade_attribute]:
             player.stats[upgrade_attribute] = player.max_stats[upgrade_attribute]
 
-    def display(self, surface, selection_no, name, value, max_value, cost):
-        if self.index == selection_no:
-            pygame.draw.rect(surface, UPGRADE_BG_COLOR_SELECTED, self.rect)
-            pygame.draw.rect(surface, UI_BORDER_COLOR, self.rect, 4)
-        else:
-            pygame.draw.rect(surface, UI_BG_COLOR, self.rect)
-            pygame.draw.rect(surface, UI_BORDER_COLOR, self.rect, 4)
-
-        self.display_names(surface, name, cost, self.index == selection_no)
-        self.display_bar(surface, value, max_value, self.index == selection_no)
+    def display(self, surface, selection_no, name, value, max_value, cost, force=True):
+        selected = self.index == selection_no
+        state = (selected, name, value, max_value, cost)
+        if state == self.state and not force:
+            return False
+        if state != self.state:
+            self.state = state
+            if selected:
+                pygame.draw.rect(self.surface, UPGRADE_BG_COLOR_SELECTED, self.local_rect)
+                pygame.draw.rect(self.surface, UI_BORDER_COLOR, self.local_rect, 4)
+            else:
+                pygame.draw.rect(self.surface, UI_BG_COLOR, self.local_rect)
+                pygame.draw.rect(self.surface, UI_BORDER_COLOR, self.local_rect, 4)
+
+            self.display_names(self.surface, name, cost, selected)
+            self.display_bar(self.surface, value, max_value, selected)
+        surface.blit(self.surface, self.rect)
+        return True
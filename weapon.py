@@ -1,4 +1,5 @@
 import pygame
+from assets import asset_manager
 
 
 class Weapon(pygame.sprite.Sprite):
@@ -9,7 +10,7 @@ class Weapon(pygame.sprite.Sprite):
 
         # Graphic
         full_path = f'../graphics/weapons/{player.weapon}/{direction}.png'
-        self.image = pygame.image.load(full_path).convert_alpha()
+        self.image = asset_manager.image(full_path)
 
         # Placement
         if direction == 'right':
@@ -0,0 +1,132 @@
+from settings import *
+
+PLAYER_TILE = 394
+STREAMED_LAYERS = ('grass', 'object')  # The boundary is a tile map covering the whole world
+
+
+class ChunkState:
+    def __init__(self):
+        # What has to survive the chunk being unloaded
+        self.cut_grass = set()
+        self.grass_variants = {}
+        self.enemies = []
+
+
+class WorldStreamer:
+    def __init__(self, layouts, create_tile, floor, chunk_size=CHUNK_SIZE, radius=STREAM_RADIUS):
+        self.layouts = layouts
+        self.create_tile = create_tile
+        self.floor = floor
+        self.chunk_size = chunk_size
+        self.chunk_pixels = chunk_size * TILESIZE
+        self.radius = radius
+
+        rows = layouts['boundary'].rows
+        cols = layouts['boundary'].cols
+        self.chunk_rows = -(-rows // chunk_size)
+        self.chunk_cols = -(-cols // chunk_size)
+
+        self.loaded = {}
+        self.grass = {}
+        self.states = {}
+        self.enemies = set()
+        self.center = None
+
+    def chunk_of(self, pos):
+        return int(pos[0] // self.chunk_pixels), int(pos[1] // self.chunk_pixels)
+
+    def cells(self, key):
+        first_col = key[0] * self.chunk_size
+        first_row = key[1] * self.chunk_size
+        for style in STREAMED_LAYERS + ('entities',):
+            layout = self.layouts[style]
+            for row_index in range(first_row, min(first_row + self.chunk_size, layout.rows)):
+                row = layout[row_index]
+                for col_index in range(first_col, min(first_col + self.chunk_size, layout.cols)):
+                    if row[col_index] != -1:
+                        yield style, row_index, col_index, row[col_index]
+
+    def state(self, key):
+        if key not in self.states:
+            state = self.states[key] = ChunkState()
+            for style, row_index, col_index, tile_id in self.cells(key):
+                if style == 'entities' and tile_id != PLAYER_TILE:
+                    state.enemies.append({'cell': (row_index, col_index), 'tile_id': tile_id, 'center': None, 'health': None})
+        return self.states[key]
+
+    def update(self, player):
+        # Chunks only change when the player crosses into another one
+        center = self.chunk_of(player.rect.center)
+        if center == self.center:
+            return
+        self.center = center
+
+        # Chunks are dropped one ring further out than they are loaded, so walking along a border doesn't thrash
+        for key in list(self.loaded):
+            if max(abs(key[0] - center[0]), abs(key[1] - center[1])) > self.radius + 1:
+                self.evict(key)
+
+        # Enemies belong to the chunk they are standing in, not the one they spawned in
+        for enemy in list(self.enemies):
+            if not enemy.alive():
+                self.enemies.discard(enemy)
+            elif self.chunk_of(enemy.hitbox.center) not in self.loaded:
+                self.park(enemy)
+
+        for chunk_y in range(max(center[1] - self.radius, 0), min(center[1] + self.radius + 1, self.chunk_rows)):
+            for chunk_x in range(max(center[0] - self.radius, 0), min(center[0] + self.radius + 1, self.chunk_cols)):
+                if (chunk_x, chunk_y) not in self.loaded:
+                    self.materialize((chunk_x, chunk_y))
+
+    def materialize(self, key):
+        state = self.state(key)
+        tiles = []
+        grass = []
+        for style, row_index, col_index, tile_id in self.cells(key):
+            cell = (row_index, col_index)
+            if style == 'grass':
+                if cell in state.cut_grass:
+                    continue
+                tile = self.create_tile(style, row_index, col_index, tile_id, state.grass_variants.get(cell))
+                state.grass_variants[cell] = tile.image
+                grass.append((tile, cell))
+                tiles.append(tile)
+            elif style != 'entities':
+                tiles.append(self.create_tile(style, row_index, col_index, tile_id))
+
+        # Enemies come back where and how they were when they were unloaded
+        for enemy_state in state.enemies:
+            row_index, col_index = enemy_state['cell']
+            enemy = self.create_tile('entities', row_index, col_index, enemy_state['tile_id'])
+            if enemy_state['center']:
+                enemy.hitbox.center = enemy_state['center']
+                enemy.rect.center = enemy.hitbox.center
+                enemy.health = enemy_state['health']
+            enemy.stream_state = enemy_state
+            self.enemies.add(enemy)
+        state.enemies = []
+
+        self.loaded[key] = tiles
+        self.grass[key] = grass
+        self.floor.bake_chunk(*key)
+
+    def evict(self, key):
+        state = self.states[key]
+        # Grass is kept apart when it is made, object tiles are Tile sprites as well
+        for tile, cell in self.grass.pop(key):
+            if not tile.alive():
+                state.cut_grass.add(cell)
+        for tile in self.loaded.pop(key):
+            tile.kill()
+        self.floor.drop_chunk(*key)
+
+    def park(self, enemy):
+        enemy_state = enemy.stream_state
+        enemy_state['center'] = enemy.hitbox.center
+        enemy_state['health'] = enemy.health
+        self.state(self.chunk_of(enemy.hitbox.center)).enemies.append(enemy_state)
+        enemy.kill()
+        self.enemies.discard(enemy)
+
+    def loaded_sprites(self):
+        return sum(len(tiles) for tiles in self.loaded.values()) + len(self.enemies)